@@ -0,0 +1,193 @@
+"""
+Migra tb_tags.chave (texto repetido em cada linha) para tb_tag_chave +
+tb_tags.chave_id.
+
+Uso:
+    python -m app.jobs.internar_chaves preparar [--lote N]
+    python -m app.jobs.internar_chaves finalizar [--lote N]
+
+1. `preparar`, com a versão antiga da aplicação no ar: cria tb_tag_chave e
+   a coluna chave_id (e o índice dela), torna chave opcional, instala um
+   trigger que preenche chave_id a partir de chave nas gravações da versão
+   antiga e preenche as linhas existentes em lotes por faixa de id.
+
+2. Deploy da versão que grava e lê só chave_id.
+
+3. `finalizar`: remove o trigger, preenche o que tiver sobrado, torna
+   chave_id NOT NULL (validada por um CHECK antes, para não varrer a tabela
+   sob ACCESS EXCLUSIVE), remove a coluna chave e troca o índice B-tree de
+   valor por um índice hash.
+"""
+import argparse
+
+from sqlalchemy import text
+
+from app.database.connection import SessionLocal, engine
+
+
+def _executar(db, sql: str, **params):
+    return db.execute(text(sql), params)
+
+
+def _criar_indices(*indices: str) -> None:
+    """Cria cada "nome ON tabela (...)" com CONCURRENTLY, se ainda não existir."""
+    db = SessionLocal()
+    try:
+        particionada = _executar(
+            db, "SELECT relkind = 'p' FROM pg_class WHERE relname = 'tb_tags'"
+        ).scalar()
+    finally:
+        db.close()
+
+    # CONCURRENTLY não roda dentro de transação nem em tabela particionada
+    concorrente = "" if particionada else "CONCURRENTLY"
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for indice in indices:
+            conn.execute(text(f"CREATE INDEX {concorrente} IF NOT EXISTS {indice}"))
+
+
+def _preencher(db, lote: int) -> None:
+    _executar(
+        db,
+        """
+        INSERT INTO tb_tag_chave (chave)
+        SELECT DISTINCT chave FROM tb_tags WHERE chave IS NOT NULL
+        ON CONFLICT (chave) DO NOTHING
+        """,
+    )
+    db.commit()
+
+    minimo, maximo = _executar(db, "SELECT min(id), max(id) FROM tb_tags").one()
+    if minimo is None:
+        return
+    for inicio in range(minimo - 1, maximo, lote):
+        _executar(
+            db,
+            """
+            UPDATE tb_tags t
+               SET chave_id = k.id
+              FROM tb_tag_chave k
+             WHERE k.chave = t.chave
+               AND t.id > :inicio AND t.id <= :fim
+               AND t.chave_id IS NULL
+            """,
+            inicio=inicio,
+            fim=inicio + lote,
+        )
+        db.commit()
+
+
+def preparar(lote: int) -> None:
+    db = SessionLocal()
+    try:
+        _executar(
+            db,
+            """
+            CREATE TABLE IF NOT EXISTS tb_tag_chave (
+                id SERIAL PRIMARY KEY,
+                chave VARCHAR(100) NOT NULL UNIQUE
+            )
+            """,
+        )
+        _executar(
+            db,
+            """
+            ALTER TABLE tb_tags
+              ADD COLUMN IF NOT EXISTS chave_id INTEGER REFERENCES tb_tag_chave (id)
+            """,
+        )
+        _executar(db, "ALTER TABLE tb_tags ALTER COLUMN chave DROP NOT NULL")
+        _executar(
+            db,
+            """
+            CREATE OR REPLACE FUNCTION fn_tb_tags_chave_id() RETURNS trigger AS $$
+            BEGIN
+                IF NEW.chave IS NOT NULL THEN
+                    INSERT INTO tb_tag_chave (chave) VALUES (NEW.chave)
+                    ON CONFLICT (chave) DO NOTHING;
+                    SELECT id INTO NEW.chave_id FROM tb_tag_chave WHERE chave = NEW.chave;
+                END IF;
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+            """,
+        )
+        _executar(db, "DROP TRIGGER IF EXISTS tg_tb_tags_chave_id ON tb_tags")
+        _executar(
+            db,
+            """
+            CREATE TRIGGER tg_tb_tags_chave_id
+            BEFORE INSERT OR UPDATE OF chave ON tb_tags
+            FOR EACH ROW EXECUTE FUNCTION fn_tb_tags_chave_id()
+            """,
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    # a versão nova filtra e junta por chave_id logo após o deploy
+    _criar_indices("ix_tb_tags_chave_id ON tb_tags (chave_id)")
+
+    db = SessionLocal()
+    try:
+        _preencher(db, lote)
+    finally:
+        db.close()
+
+
+def finalizar(lote: int) -> None:
+    db = SessionLocal()
+    try:
+        _executar(db, "DROP TRIGGER IF EXISTS tg_tb_tags_chave_id ON tb_tags")
+        _executar(db, "DROP FUNCTION IF EXISTS fn_tb_tags_chave_id()")
+        db.commit()
+
+        _preencher(db, lote)
+
+        # SET NOT NULL aproveita um CHECK já validado e não varre a tabela;
+        # a validação em si não bloqueia leituras nem gravações
+        _executar(
+            db,
+            """
+            ALTER TABLE tb_tags
+              ADD CONSTRAINT ck_tb_tags_chave_id CHECK (chave_id IS NOT NULL) NOT VALID
+            """,
+        )
+        db.commit()
+        _executar(db, "ALTER TABLE tb_tags VALIDATE CONSTRAINT ck_tb_tags_chave_id")
+        db.commit()
+        _executar(db, "ALTER TABLE tb_tags ALTER COLUMN chave_id SET NOT NULL")
+        _executar(db, "ALTER TABLE tb_tags DROP CONSTRAINT ck_tb_tags_chave_id")
+        db.commit()
+    finally:
+        db.close()
+
+    # o índice hash fica pronto antes de o B-tree de valor sair
+    _criar_indices(
+        "ix_tb_tags_chave_id ON tb_tags (chave_id)",
+        "ix_tb_tags_valor_hash ON tb_tags USING hash (valor)",
+    )
+
+    db = SessionLocal()
+    try:
+        _executar(db, "ALTER TABLE tb_tags DROP COLUMN chave")
+        _executar(db, "DROP INDEX IF EXISTS ix_tb_tags_valor")
+        db.commit()
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migra chaves de tag para tb_tag_chave.")
+    parser.add_argument("etapa", choices=["preparar", "finalizar"])
+    parser.add_argument("--lote", type=int, default=10000)
+    args = parser.parse_args()
+
+    if args.etapa == "preparar":
+        preparar(args.lote)
+    else:
+        finalizar(args.lote)
+
+
+if __name__ == "__main__":
+    main()
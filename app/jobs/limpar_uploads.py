@@ -0,0 +1,94 @@
+"""
+Limpeza das sessões de upload retomável expiradas (tb_upload_sessao).
+
+Uso: python -m app.jobs.limpar_uploads [--lote N]
+
+Sessões abandonadas têm o envio multipart abortado no storage (o que
+libera as partes já gravadas) e a linha removida. Se o objeto chegou a
+ser montado mas o Documento não foi gravado (queda entre as duas coisas),
+o objeto também é apagado. Sessões concluídas só têm a linha removida.
+Pensado para rodar periodicamente (cron); no S3, vale manter também uma
+regra de ciclo de vida AbortIncompleteMultipartUpload como rede de
+segurança.
+"""
+import argparse
+import logging
+from datetime import datetime
+
+from sqlalchemy import or_, select
+
+from app.database.connection import SessionLocal
+from app.models.document import Documento
+from app.models.upload import UploadSessao
+from app.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+
+def _descartar(db, sessao: UploadSessao) -> None:
+    storage = get_storage()
+    storage.abortar_multipart(sessao.bucket_key, sessao.multipart_id)
+
+    referenciado = db.scalar(
+        select(Documento.id).where(Documento.bucket_key == sessao.bucket_key)
+    )
+    if referenciado is None:
+        storage.delete(sessao.bucket_key)
+
+
+def limpar(lote: int) -> int:
+    total = 0
+    db = SessionLocal()
+    try:
+        while True:
+            sessoes = db.scalars(
+                select(UploadSessao)
+                .where(
+                    UploadSessao.expira_em < datetime.utcnow(),
+                    # não descarta uma sessão no meio de uma chamada ao storage
+                    or_(
+                        UploadSessao.reservada_ate.is_(None),
+                        UploadSessao.reservada_ate < datetime.utcnow(),
+                    ),
+                )
+                .order_by(UploadSessao.expira_em)
+                .limit(lote)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not sessoes:
+                break
+
+            removidas = 0
+            for sessao in sessoes:
+                if sessao.concluido_em is None:
+                    try:
+                        _descartar(db, sessao)
+                    except Exception:
+                        # fica para a próxima execução
+                        logger.exception("Falha ao descartar o upload %s", sessao.id)
+                        continue
+                db.delete(sessao)
+                removidas += 1
+            db.commit()
+            total += removidas
+
+            if len(sessoes) < lote or removidas == 0:
+                break
+    finally:
+        db.close()
+
+    return total
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Remove sessões de upload retomável expiradas.")
+    parser.add_argument("--lote", type=int, default=500)
+    args = parser.parse_args()
+
+    total = limpar(args.lote)
+    print(f"{total} sessão(ões) de upload removida(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Alterações de esquema que o create_all do main.py não aplica a uma base
+existente (ele só cria as tabelas que faltam): colunas e índices novos em
+tabelas que já existem.
+
+Uso: python -m app.jobs.migrar
+
+Rodar antes do deploy da versão que depende das alterações. Os passos são
+idempotentes: rodar de novo só aplica o que faltar, inclusive depois de
+uma execução interrompida.
+"""
+import argparse
+import logging
+import os
+from typing import Callable
+
+from sqlalchemy import text
+
+from app.database.connection import engine
+
+logger = logging.getLogger(__name__)
+
+# Espera máxima por um lock de tabela. Um ALTER TABLE enfileirado atrás de
+# uma transação longa bloqueia todas as consultas que chegam depois dele;
+# melhor desistir e rodar de novo.
+MIGRAR_LOCK_TIMEOUT = os.getenv("MIGRAR_LOCK_TIMEOUT", "5s")
+
+
+def _particionada(conn, tabela: str) -> bool:
+    return bool(
+        conn.execute(
+            text("SELECT relkind = 'p' FROM pg_class WHERE relname = :tabela"),
+            {"tabela": tabela},
+        ).scalar()
+    )
+
+
+def _criar_indice(conn, nome: str, tabela: str, coluna: str) -> None:
+    # Qualquer índice válido que comece pela coluna serve, inclusive o
+    # ix_*_part_* criado por app.jobs.particionar.
+    existente = conn.execute(
+        text(
+            """
+            SELECT 1
+              FROM pg_index i
+              JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+             WHERE i.indrelid = CAST(:tabela AS regclass)
+               AND a.attname = :coluna
+               AND i.indisvalid
+            """
+        ),
+        {"tabela": tabela, "coluna": coluna},
+    ).first()
+    if existente is not None:
+        return
+
+    # CONCURRENTLY não roda em tabela particionada
+    concorrente = "" if _particionada(conn, tabela) else "CONCURRENTLY"
+    # um CREATE INDEX CONCURRENTLY interrompido deixa o índice inválido
+    conn.execute(text(f"DROP INDEX {concorrente} IF EXISTS {nome}"))
+    conn.execute(text(f"CREATE INDEX {concorrente} {nome} ON {tabela} ({coluna})"))
+
+
+def _adicionar_colunas(conn, tabela: str, colunas: list[str]) -> None:
+    # colunas opcionais sem default: só muda o catálogo, sem reescrever a tabela
+    adicoes = ", ".join(f"ADD COLUMN IF NOT EXISTS {coluna}" for coluna in colunas)
+    conn.execute(text(f"ALTER TABLE {tabela} {adicoes}"))
+
+
+PASSOS: list[tuple[str, Callable]] = [
+    (
+        "ix_tb_documento_bucket_key",
+        lambda conn: _criar_indice(conn, "ix_tb_documento_bucket_key", "tb_documento", "bucket_key"),
+    ),
+    (
+        "tb_documento.compressao, tb_documento.tamanho_armazenado",
+        lambda conn: _adicionar_colunas(
+            conn, "tb_documento", ["compressao VARCHAR(10)", "tamanho_armazenado BIGINT"]
+        ),
+    ),
+    (
+        "tb_upload_sessao.reservada_por, tb_upload_sessao.reservada_ate",
+        lambda conn: _adicionar_colunas(
+            conn, "tb_upload_sessao", ["reservada_por VARCHAR(32)", "reservada_ate TIMESTAMP"]
+        ),
+    ),
+]
+
+
+def migrar() -> None:
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SELECT set_config('lock_timeout', :valor, false)"), {"valor": MIGRAR_LOCK_TIMEOUT})
+        for nome, passo in PASSOS:
+            logger.info("Aplicando %s", nome)
+            passo(conn)
+
+
+def main() -> None:
+    argparse.ArgumentParser(description="Aplica alterações de esquema a uma base existente.").parse_args()
+    logging.basicConfig(level=logging.INFO)
+    migrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Worker do outbox: executa em segundo plano os efeitos colaterais no bucket
+(remoções, cópias) registrados em tb_outbox, com novas tentativas e backoff
+exponencial.
+
+Uso: python -m app.jobs.outbox_worker [--threads N]
+     python -m app.jobs.outbox_worker --falhas
+     python -m app.jobs.outbox_worker --reprocessar-falhas [ID ...]
+
+--falhas lista os eventos que esgotaram as tentativas (status "falhou"),
+com o payload que ainda falta executar; --reprocessar-falhas devolve esses
+eventos (todos, ou só os ids informados) à fila.
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Sequence
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from app.database.connection import SessionLocal
+from app.models.document import Documento
+from app.models.outbox import OutboxEvento
+from app.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_WORKER_THREADS = int(os.getenv("OUTBOX_WORKER_THREADS", "4"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "2"))
+OUTBOX_MAX_TENTATIVAS = int(os.getenv("OUTBOX_MAX_TENTATIVAS", "10"))
+OUTBOX_BACKOFF_BASE_SECONDS = int(os.getenv("OUTBOX_BACKOFF_BASE_SECONDS", "5"))
+OUTBOX_BACKOFF_MAX_SECONDS = int(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", "3600"))
+
+
+class FalhaParcial(Exception):
+    """
+    Parte do evento foi executada: a nova tentativa deve usar `payload`,
+    só com o que ainda falta.
+    """
+
+    def __init__(self, mensagem: str, payload: dict):
+        super().__init__(mensagem)
+        self.payload = payload
+
+
+def _apagar_objeto(db: Session, payload: dict) -> None:
+    get_storage().delete(payload["bucket_key"])
+
+
+def _apagar_objetos(db: Session, payload: dict) -> None:
+    erros = get_storage().delete_many(payload["bucket_keys"])
+    if erros:
+        exemplo = next(iter(erros.items()))
+        raise FalhaParcial(
+            f"{len(erros)} objeto(s) não apagado(s), ex.: {exemplo[0]}: {exemplo[1]}",
+            {"bucket_keys": sorted(erros)},
+        )
+
+
+def _apagar_objeto_orfao(db: Session, payload: dict) -> None:
+    # Só apaga se nenhum documento passou a referenciar o objeto: cobre
+    # uploads interrompidos entre o PUT e o commit do Documento.
+    referenciado = db.scalar(
+        select(Documento.id).where(Documento.bucket_key == payload["bucket_key"])
+    )
+    if referenciado is None:
+        get_storage().delete(payload["bucket_key"])
+
+
+def _copiar_objeto(db: Session, payload: dict) -> None:
+    get_storage().copy(payload["origem"], payload["destino"])
+
+
+HANDLERS: dict[str, Callable[[Session, dict], None]] = {
+    "apagar_objeto": _apagar_objeto,
+    "apagar_objetos": _apagar_objetos,
+    "apagar_objeto_orfao": _apagar_objeto_orfao,
+    "copiar_objeto": _copiar_objeto,
+}
+
+
+def _backoff(tentativas: int) -> timedelta:
+    segundos = OUTBOX_BACKOFF_BASE_SECONDS * (2 ** (tentativas - 1))
+    return timedelta(seconds=min(segundos, OUTBOX_BACKOFF_MAX_SECONDS))
+
+
+def processar_lote(limite: int = OUTBOX_BATCH_SIZE) -> int:
+    """
+    Reivindica até `limite` eventos vencidos (FOR UPDATE SKIP LOCKED, para
+    que várias threads/processos dividam a fila) e os executa. Eventos
+    concluídos são apagados; os que falham voltam para a fila com backoff
+    até OUTBOX_MAX_TENTATIVAS, depois ficam com status "falhou". Numa
+    FalhaParcial o payload do evento passa a ser só o que ainda falta.
+    Retorna quantos eventos foram processados.
+    """
+    db = SessionLocal()
+    try:
+        eventos = db.scalars(
+            select(OutboxEvento)
+            .where(
+                OutboxEvento.status == "pendente",
+                OutboxEvento.disponivel_em <= datetime.utcnow(),
+            )
+            .order_by(OutboxEvento.id)
+            .limit(limite)
+            .with_for_update(skip_locked=True)
+        ).all()
+
+        concluidos = []
+        for evento in eventos:
+            handler = HANDLERS.get(evento.tipo)
+            try:
+                if handler is None:
+                    raise ValueError(f"Tipo de evento desconhecido: {evento.tipo}")
+                handler(db, evento.payload)
+            except Exception as e:
+                if isinstance(e, FalhaParcial):
+                    evento.payload = e.payload
+                evento.tentativas += 1
+                evento.ultimo_erro = str(e)
+                if evento.tentativas >= OUTBOX_MAX_TENTATIVAS:
+                    evento.status = "falhou"
+                    logger.error("Evento %s (%s) falhou: %s", evento.id, evento.tipo, e)
+                else:
+                    evento.disponivel_em = datetime.utcnow() + _backoff(evento.tentativas)
+            else:
+                concluidos.append(evento.id)
+
+        if concluidos:
+            db.execute(delete(OutboxEvento).where(OutboxEvento.id.in_(concluidos)))
+
+        db.commit()
+        return len(eventos)
+    except Exception:
+        db.rollback()
+        logger.exception("Erro ao processar lote do outbox")
+        return 0
+    finally:
+        db.close()
+
+
+def listar_falhas() -> list[OutboxEvento]:
+    """Eventos que esgotaram as tentativas, do mais antigo ao mais novo."""
+    with SessionLocal() as db:
+        return list(
+            db.scalars(
+                select(OutboxEvento)
+                .where(OutboxEvento.status == "falhou")
+                .order_by(OutboxEvento.id)
+            )
+        )
+
+
+def reprocessar_falhas(ids: Optional[Sequence[int]] = None) -> int:
+    """
+    Devolve à fila, com as tentativas zeradas, os eventos com status
+    "falhou" (todos, ou só os de `ids`). Retorna quantos voltaram.
+    """
+    condicoes = [OutboxEvento.status == "falhou"]
+    if ids:
+        condicoes.append(OutboxEvento.id.in_(ids))
+
+    with SessionLocal() as db:
+        resultado = db.execute(
+            update(OutboxEvento)
+            .where(*condicoes)
+            .values(status="pendente", tentativas=0, disponivel_em=datetime.utcnow())
+        )
+        db.commit()
+        return resultado.rowcount
+
+
+def _loop(parar: threading.Event) -> None:
+    while not parar.is_set():
+        if processar_lote() == 0:
+            parar.wait(OUTBOX_POLL_SECONDS)
+
+
+def iniciar_workers(threads: int = OUTBOX_WORKER_THREADS) -> threading.Event:
+    """
+    Sobe `threads` threads daemon consumindo o outbox. Retorna o Event que
+    as encerra quando sinalizado.
+    """
+    parar = threading.Event()
+    for i in range(threads):
+        threading.Thread(
+            target=_loop,
+            args=(parar,),
+            name=f"outbox-worker-{i}",
+            daemon=True,
+        ).start()
+    return parar
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Worker do outbox de efeitos no bucket.")
+    parser.add_argument("--threads", type=int, default=OUTBOX_WORKER_THREADS)
+    parser.add_argument(
+        "--falhas",
+        action="store_true",
+        help='lista os eventos com status "falhou" (uma linha JSON por evento) e sai',
+    )
+    parser.add_argument(
+        "--reprocessar-falhas",
+        nargs="*",
+        type=int,
+        metavar="ID",
+        help='devolve à fila os eventos com status "falhou" (todos, ou os ids informados) e sai',
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.falhas:
+        for evento in listar_falhas():
+            print(json.dumps({
+                "id": evento.id,
+                "tipo": evento.tipo,
+                "payload": evento.payload,
+                "tentativas": evento.tentativas,
+                "ultimo_erro": evento.ultimo_erro,
+                "criado_em": evento.criado_em.isoformat(),
+            }, ensure_ascii=False))
+        return
+
+    if args.reprocessar_falhas is not None:
+        logger.info("%s evento(s) devolvido(s) à fila", reprocessar_falhas(args.reprocessar_falhas))
+        return
+
+    parar = iniciar_workers(args.threads)
+    try:
+        parar.wait()
+    except KeyboardInterrupt:
+        parar.set()
+
+
+if __name__ == "__main__":
+    main()
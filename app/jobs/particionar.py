@@ -0,0 +1,492 @@
+"""
+Particionamento declarativo de tb_documento e tb_tags por cliente_id.
+
+Uso:
+    python -m app.jobs.particionar preparar [--lote N]
+    python -m app.jobs.particionar backfill [--lote N]
+    python -m app.jobs.particionar converter --estrategia hash --particoes 16 [--lote N]
+    python -m app.jobs.particionar converter --estrategia list [--lote N]
+    python -m app.jobs.particionar nova-particao --cliente-id N
+
+Passos para uma base existente:
+
+1. `preparar`, com a versão antiga da aplicação no ar: cria
+   tb_tags.cliente_id (opcional) e o índice dela, instala um trigger que
+   preenche a coluna a partir de tb_documento nas gravações da versão
+   antiga e preenche as linhas existentes em lotes por faixa de id.
+
+2. Deploy da versão que grava e lê Tag.cliente_id.
+
+3. `backfill`: remove o trigger, preenche o que tiver sobrado e torna a
+   coluna NOT NULL (validada por um CHECK antes, para não varrer a tabela
+   sob ACCESS EXCLUSIVE).
+
+4. `converter` cria tb_documento_part/tb_tags_part particionadas por
+   cliente_id (HASH com N partições, ou LIST com uma partição por cliente
+   existente mais uma DEFAULT) e instala triggers que registram em
+   tb_particionar_delta as linhas alteradas a partir dali. Copia os dados
+   em lotes e reaplica o delta em passadas de recuperação, tudo com a
+   aplicação no ar; só quando o delta restante é pequeno (até um lote)
+   trava as tabelas em ACCESS EXCLUSIVE, aplica esse resto e troca os
+   nomes. As tabelas antigas ficam como *_legado para conferência e podem
+   ser removidas depois com DROP TABLE.
+
+Em tabelas particionadas a chave primária e as restrições UNIQUE precisam
+incluir cliente_id: a PK passa a ser (cliente_id, id), uuid fica único por
+cliente (a unicidade global continua garantida na prática pelos 12
+caracteres aleatórios de generate_uuid12) e tb_tags referencia
+(cliente_id, documento_id). O mapeamento ORM não muda.
+
+5. Com LIST, `nova-particao` cria a partição de um cliente novo. Até lá os
+   documentos dele caem na DEFAULT, e o Postgres recusa criar a partição
+   enquanto a DEFAULT tiver linhas do cliente: o comando move essas
+   linhas para a partição nova na mesma transação, com tb_documento e
+   tb_tags travadas em ACCESS EXCLUSIVE (o lock que o CREATE TABLE ...
+   PARTITION OF já pega) do início ao fim. Rodar no cadastro do cliente,
+   antes do primeiro upload, deixa o movimento vazio.
+"""
+import argparse
+
+from sqlalchemy import text
+
+from app.database.connection import SessionLocal, engine
+
+# Passadas de recuperação do delta antes de travar as tabelas.
+MAX_PASSADAS_DELTA = 20
+
+
+def _executar(db, sql: str, **params):
+    return db.execute(text(sql), params)
+
+
+def _preencher(db, lote: int) -> None:
+    minimo, maximo = _executar(db, "SELECT min(id), max(id) FROM tb_tags").one()
+    if minimo is None:
+        return
+    for inicio in range(minimo - 1, maximo, lote):
+        _executar(
+            db,
+            """
+            UPDATE tb_tags t
+               SET cliente_id = d.cliente_id
+              FROM tb_documento d
+             WHERE d.id = t.documento_id
+               AND t.id > :inicio AND t.id <= :fim
+               AND t.cliente_id IS NULL
+            """,
+            inicio=inicio,
+            fim=inicio + lote,
+        )
+        db.commit()
+
+
+def preparar(lote: int) -> None:
+    db = SessionLocal()
+    try:
+        _executar(db, "ALTER TABLE tb_tags ADD COLUMN IF NOT EXISTS cliente_id BIGINT")
+        _executar(
+            db,
+            """
+            CREATE OR REPLACE FUNCTION fn_tb_tags_cliente_id() RETURNS trigger AS $$
+            BEGIN
+                SELECT cliente_id INTO NEW.cliente_id
+                  FROM tb_documento WHERE id = NEW.documento_id;
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+            """,
+        )
+        _executar(db, "DROP TRIGGER IF EXISTS tg_tb_tags_cliente_id ON tb_tags")
+        _executar(
+            db,
+            """
+            CREATE TRIGGER tg_tb_tags_cliente_id
+            BEFORE INSERT OR UPDATE OF documento_id ON tb_tags
+            FOR EACH ROW EXECUTE FUNCTION fn_tb_tags_cliente_id()
+            """,
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    # a versão nova filtra por cliente_id logo após o deploy
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(
+            text(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tb_tags_cliente_id "
+                "ON tb_tags (cliente_id)"
+            )
+        )
+
+    db = SessionLocal()
+    try:
+        _preencher(db, lote)
+    finally:
+        db.close()
+
+
+def backfill(lote: int) -> None:
+    db = SessionLocal()
+    try:
+        _executar(db, "DROP TRIGGER IF EXISTS tg_tb_tags_cliente_id ON tb_tags")
+        _executar(db, "DROP FUNCTION IF EXISTS fn_tb_tags_cliente_id()")
+        db.commit()
+
+        _preencher(db, lote)
+
+        # SET NOT NULL aproveita um CHECK já validado e não varre a tabela;
+        # a validação em si não bloqueia leituras nem gravações
+        _executar(
+            db,
+            """
+            ALTER TABLE tb_tags
+              ADD CONSTRAINT ck_tb_tags_cliente_id CHECK (cliente_id IS NOT NULL) NOT VALID
+            """,
+        )
+        db.commit()
+        _executar(db, "ALTER TABLE tb_tags VALIDATE CONSTRAINT ck_tb_tags_cliente_id")
+        db.commit()
+        _executar(db, "ALTER TABLE tb_tags ALTER COLUMN cliente_id SET NOT NULL")
+        _executar(db, "ALTER TABLE tb_tags DROP CONSTRAINT ck_tb_tags_cliente_id")
+        db.commit()
+    finally:
+        db.close()
+
+
+def _criar_tabelas(db, estrategia: str, particoes: int) -> None:
+    metodo = "HASH" if estrategia == "hash" else "LIST"
+
+    _executar(
+        db,
+        f"""
+        CREATE TABLE tb_documento_part (LIKE tb_documento INCLUDING DEFAULTS)
+        PARTITION BY {metodo} (cliente_id)
+        """,
+    )
+    _executar(db, "ALTER TABLE tb_documento_part ADD PRIMARY KEY (cliente_id, id)")
+    _executar(db, "ALTER TABLE tb_documento_part ADD UNIQUE (cliente_id, uuid)")
+    _executar(db, "CREATE INDEX ix_tb_documento_part_uuid ON tb_documento_part (uuid)")
+    _executar(
+        db,
+        "CREATE INDEX ix_tb_documento_part_bucket_key ON tb_documento_part (bucket_key)",
+    )
+    _executar(
+        db,
+        "CREATE INDEX ix_tb_documento_part_criado_em ON tb_documento_part (cliente_id, criado_em)",
+    )
+
+    _executar(
+        db,
+        f"""
+        CREATE TABLE tb_tags_part (LIKE tb_tags INCLUDING DEFAULTS)
+        PARTITION BY {metodo} (cliente_id)
+        """,
+    )
+    _executar(db, "ALTER TABLE tb_tags_part ADD PRIMARY KEY (cliente_id, id)")
+    _executar(
+        db,
+        """
+        ALTER TABLE tb_tags_part
+          ADD FOREIGN KEY (cliente_id, documento_id)
+          REFERENCES tb_documento_part (cliente_id, id) ON DELETE CASCADE
+        """,
+    )
+    _executar(
+        db,
+        "ALTER TABLE tb_tags_part ADD FOREIGN KEY (chave_id) REFERENCES tb_tag_chave (id)",
+    )
+    _executar(db, "CREATE INDEX ix_tb_tags_part_documento_id ON tb_tags_part (documento_id)")
+    _executar(db, "CREATE INDEX ix_tb_tags_part_chave_id ON tb_tags_part (cliente_id, chave_id)")
+    _executar(db, "CREATE INDEX ix_tb_tags_part_valor_hash ON tb_tags_part USING hash (valor)")
+
+    if estrategia == "hash":
+        for i in range(particoes):
+            for tabela in ("tb_documento", "tb_tags"):
+                _executar(
+                    db,
+                    f"""
+                    CREATE TABLE {tabela}_p{i} PARTITION OF {tabela}_part
+                    FOR VALUES WITH (MODULUS {particoes}, REMAINDER {i})
+                    """,
+                )
+    else:
+        clientes = _executar(db, "SELECT DISTINCT cliente_id FROM tb_documento").scalars().all()
+        for cliente_id in clientes:
+            _criar_particao_cliente(db, int(cliente_id), sufixo_pai="_part")
+        for tabela in ("tb_documento", "tb_tags"):
+            _executar(db, f"CREATE TABLE {tabela}_default PARTITION OF {tabela}_part DEFAULT")
+
+
+def _criar_particao_cliente(db, cliente_id: int, sufixo_pai: str = "") -> None:
+    for tabela in ("tb_documento", "tb_tags"):
+        _executar(
+            db,
+            f"""
+            CREATE TABLE {tabela}_c{cliente_id} PARTITION OF {tabela}{sufixo_pai}
+            FOR VALUES IN ({cliente_id})
+            """,
+        )
+
+
+def _copiar_em_lotes(db, tabela: str, lote: int, condicao: str = "TRUE") -> None:
+    minimo, maximo = _executar(db, f"SELECT min(id), max(id) FROM {tabela}").one()
+    if minimo is None:
+        return
+    for inicio in range(minimo - 1, maximo, lote):
+        _executar(
+            db,
+            f"""
+            INSERT INTO {tabela}_part
+            SELECT * FROM {tabela} o
+             WHERE o.id > :inicio AND o.id <= :fim AND {condicao}
+            ON CONFLICT DO NOTHING
+            """,
+            inicio=inicio,
+            fim=inicio + lote,
+        )
+        db.commit()
+
+
+def _registrar_delta(db) -> None:
+    """
+    Triggers que anotam em tb_particionar_delta o (cliente_id, id) de cada
+    linha inserida, alterada ou removida nas tabelas originais.
+    """
+    _executar(
+        db,
+        """
+        CREATE TABLE tb_particionar_delta (
+            seq BIGSERIAL PRIMARY KEY,
+            tabela TEXT NOT NULL,
+            id BIGINT NOT NULL,
+            cliente_id BIGINT NOT NULL
+        )
+        """,
+    )
+    _executar(
+        db,
+        """
+        CREATE OR REPLACE FUNCTION fn_particionar_delta() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                INSERT INTO tb_particionar_delta (tabela, id, cliente_id)
+                VALUES (TG_TABLE_NAME, OLD.id, OLD.cliente_id);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO tb_particionar_delta (tabela, id, cliente_id)
+                VALUES (TG_TABLE_NAME, NEW.id, NEW.cliente_id);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+    )
+    for tabela in ("tb_documento", "tb_tags"):
+        _executar(
+            db,
+            f"""
+            CREATE TRIGGER tg_particionar_delta
+            AFTER INSERT OR UPDATE OR DELETE ON {tabela}
+            FOR EACH ROW EXECUTE FUNCTION fn_particionar_delta()
+            """,
+        )
+
+
+def _aplicar_delta(db) -> int:
+    """
+    Leva a *_part o estado atual das linhas anotadas no delta (remove e
+    recopia cada uma) e descarta as anotações aplicadas. Retorna quantas
+    anotações foram aplicadas. Não faz commit.
+    """
+    ate = _executar(db, "SELECT max(seq) FROM tb_particionar_delta").scalar()
+    if ate is None:
+        return 0
+
+    alterados = """
+        SELECT DISTINCT cliente_id, id FROM tb_particionar_delta
+         WHERE tabela = :tabela AND seq <= :ate
+    """
+
+    # documentos: as tags saem junto pelo ON DELETE CASCADE e são
+    # recopiadas a partir da tabela original
+    _executar(
+        db,
+        f"""
+        DELETE FROM tb_documento_part p
+         USING ({alterados}) a
+         WHERE p.cliente_id = a.cliente_id AND p.id = a.id
+        """,
+        tabela="tb_documento",
+        ate=ate,
+    )
+    _executar(
+        db,
+        f"""
+        INSERT INTO tb_documento_part
+        SELECT o.* FROM tb_documento o
+          JOIN ({alterados}) a ON a.id = o.id AND a.cliente_id = o.cliente_id
+        ON CONFLICT DO NOTHING
+        """,
+        tabela="tb_documento",
+        ate=ate,
+    )
+    _executar(
+        db,
+        f"""
+        INSERT INTO tb_tags_part
+        SELECT t.* FROM tb_tags t
+          JOIN ({alterados}) a ON a.id = t.documento_id AND a.cliente_id = t.cliente_id
+        ON CONFLICT DO NOTHING
+        """,
+        tabela="tb_documento",
+        ate=ate,
+    )
+
+    # tags alteradas diretamente
+    _executar(
+        db,
+        f"""
+        DELETE FROM tb_tags_part p
+         USING ({alterados}) a
+         WHERE p.cliente_id = a.cliente_id AND p.id = a.id
+        """,
+        tabela="tb_tags",
+        ate=ate,
+    )
+    _executar(
+        db,
+        f"""
+        INSERT INTO tb_tags_part
+        SELECT t.* FROM tb_tags t
+          JOIN ({alterados}) a ON a.id = t.id AND a.cliente_id = t.cliente_id
+         WHERE EXISTS (
+               SELECT 1 FROM tb_documento_part d
+                WHERE d.id = t.documento_id AND d.cliente_id = t.cliente_id
+         )
+        ON CONFLICT DO NOTHING
+        """,
+        tabela="tb_tags",
+        ate=ate,
+    )
+
+    return _executar(
+        db, "DELETE FROM tb_particionar_delta WHERE seq <= :ate", ate=ate
+    ).rowcount
+
+
+def converter(estrategia: str, particoes: int, lote: int) -> None:
+    db = SessionLocal()
+    try:
+        _criar_tabelas(db, estrategia, particoes)
+        # o delta começa antes da cópia: toda alteração confirmada depois
+        # deste commit é reaplicada, a cópia não precisa ser consistente
+        _registrar_delta(db)
+        db.commit()
+
+        _copiar_em_lotes(db, "tb_documento", lote)
+        # tags de documentos criados depois da cópia acima entram pelo
+        # delta, para não violar a FK
+        _copiar_em_lotes(
+            db,
+            "tb_tags",
+            lote,
+            condicao="""EXISTS (
+                SELECT 1 FROM tb_documento_part d
+                 WHERE d.id = o.documento_id AND d.cliente_id = o.cliente_id
+            )""",
+        )
+
+        # recuperação com a aplicação no ar, até sobrar pouco
+        for _ in range(MAX_PASSADAS_DELTA):
+            aplicadas = _aplicar_delta(db)
+            db.commit()
+            if aplicadas <= lote:
+                break
+
+        _executar(db, "LOCK TABLE tb_documento, tb_tags IN ACCESS EXCLUSIVE MODE")
+        _aplicar_delta(db)
+
+        for tabela in ("tb_documento", "tb_tags"):
+            _executar(db, f"DROP TRIGGER tg_particionar_delta ON {tabela}")
+            _executar(db, f"ALTER TABLE {tabela} RENAME TO {tabela}_legado")
+            _executar(db, f"ALTER TABLE {tabela}_part RENAME TO {tabela}")
+            # a sequência passa a pertencer à tabela nova, para sobreviver
+            # ao DROP da tabela legada
+            _executar(db, f"ALTER SEQUENCE {tabela}_id_seq OWNED BY {tabela}.id")
+        _executar(db, "DROP TABLE tb_particionar_delta")
+        _executar(db, "DROP FUNCTION fn_particionar_delta()")
+        db.commit()
+    finally:
+        db.close()
+
+
+def nova_particao(cliente_id: int) -> None:
+    db = SessionLocal()
+    try:
+        default = _executar(db, "SELECT to_regclass('tb_documento_default')").scalar()
+        if default is None:
+            _criar_particao_cliente(db, cliente_id)
+            db.commit()
+            return
+
+        # Trava antes de ler a DEFAULT: nenhuma linha do cliente chega
+        # entre a cópia e o CREATE TABLE. Mesma ordem das gravações da
+        # aplicação (documento, depois tags).
+        _executar(db, "LOCK TABLE tb_documento, tb_tags IN ACCESS EXCLUSIVE MODE")
+        for tabela in ("tb_documento", "tb_tags"):
+            _executar(
+                db,
+                f"""
+                CREATE TEMPORARY TABLE tmp_{tabela} ON COMMIT DROP AS
+                SELECT * FROM {tabela}_default WHERE cliente_id = :cliente_id
+                """,
+                cliente_id=cliente_id,
+            )
+        for tabela in ("tb_tags", "tb_documento"):
+            _executar(
+                db,
+                f"DELETE FROM {tabela}_default WHERE cliente_id = :cliente_id",
+                cliente_id=cliente_id,
+            )
+
+        _criar_particao_cliente(db, cliente_id)
+
+        for tabela in ("tb_documento", "tb_tags"):
+            _executar(db, f"INSERT INTO {tabela} SELECT * FROM tmp_{tabela}")
+        db.commit()
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Particionamento de tb_documento/tb_tags por cliente_id.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_preparar = sub.add_parser("preparar")
+    p_preparar.add_argument("--lote", type=int, default=10000)
+
+    p_backfill = sub.add_parser("backfill")
+    p_backfill.add_argument("--lote", type=int, default=10000)
+
+    p_converter = sub.add_parser("converter")
+    p_converter.add_argument("--estrategia", choices=["hash", "list"], default="hash")
+    p_converter.add_argument("--particoes", type=int, default=16)
+    p_converter.add_argument("--lote", type=int, default=10000)
+
+    p_nova = sub.add_parser("nova-particao")
+    p_nova.add_argument("--cliente-id", type=int, required=True)
+
+    args = parser.parse_args()
+
+    if args.comando == "preparar":
+        preparar(args.lote)
+    elif args.comando == "backfill":
+        backfill(args.lote)
+    elif args.comando == "converter":
+        converter(args.estrategia, args.particoes, args.lote)
+    else:
+        nova_particao(args.cliente_id)
+
+
+if __name__ == "__main__":
+    main()
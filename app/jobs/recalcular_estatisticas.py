@@ -0,0 +1,86 @@
+"""
+Recalcula as tabelas de estatísticas por cliente a partir de tb_documento.
+
+Uso: python -m app.jobs.recalcular_estatisticas [--cliente-id N]
+
+As tabelas de estatísticas ficam bloqueadas (EXCLUSIVE) durante o
+recálculo: uploads e remoções concorrentes esperam o commit e aplicam seus
+deltas por cima dos totais novos, sem contagem dupla.
+"""
+import argparse
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, literal, select, text
+
+from app.database.connection import SessionLocal
+from app.models.document import Documento
+from app.models.estatistica import ClienteEstatistica, ClienteEstatisticaTipo
+
+
+def recalcular(cliente_id: Optional[int] = None) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(
+            text(
+                "LOCK TABLE tb_cliente_estatistica, tb_cliente_estatistica_tipo "
+                "IN EXCLUSIVE MODE"
+            )
+        )
+
+        filtro = [] if cliente_id is None else [Documento.cliente_id == cliente_id]
+        for tabela in (ClienteEstatistica, ClienteEstatisticaTipo):
+            stmt = delete(tabela)
+            if cliente_id is not None:
+                stmt = stmt.where(tabela.cliente_id == cliente_id)
+            db.execute(stmt)
+
+        db.execute(
+            insert(ClienteEstatistica).from_select(
+                [
+                    "cliente_id",
+                    "total_documentos",
+                    "total_bytes",
+                    "ultimo_upload_em",
+                    "atualizado_em",
+                ],
+                select(
+                    Documento.cliente_id,
+                    func.count(),
+                    func.coalesce(func.sum(Documento.tamanho_bytes), 0),
+                    func.max(Documento.criado_em),
+                    literal(datetime.utcnow()),
+                )
+                .where(*filtro)
+                .group_by(Documento.cliente_id),
+            )
+        )
+        db.execute(
+            insert(ClienteEstatisticaTipo).from_select(
+                ["cliente_id", "content_type", "total_documentos", "total_bytes"],
+                select(
+                    Documento.cliente_id,
+                    Documento.content_type,
+                    func.count(),
+                    func.coalesce(func.sum(Documento.tamanho_bytes), 0),
+                )
+                .where(*filtro)
+                .group_by(Documento.cliente_id, Documento.content_type),
+            )
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recalcula as estatísticas por cliente.")
+    parser.add_argument("--cliente-id", type=int, default=None)
+    args = parser.parse_args()
+
+    recalcular(args.cliente_id)
+    print("Estatísticas recalculadas.")
+
+
+if __name__ == "__main__":
+    main()
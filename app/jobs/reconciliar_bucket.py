@@ -0,0 +1,86 @@
+"""
+Reconciliação de objetos órfãos: lista o storage e aponta os objetos que
+nenhum registro de tb_documento referencia.
+
+Uso: python -m app.jobs.reconciliar_bucket [--prefixo P] [--idade-minima-horas H] [--apagar]
+
+Sem --apagar apenas imprime as chaves órfãs. Com --apagar enfileira um
+evento "apagar_objeto_orfao" por chave; o worker do outbox confere de novo
+a ausência do documento antes de apagar.
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.database.connection import SessionLocal
+from app.models.document import Documento
+from app.storage import get_storage
+from app.utils.outbox import enfileirar
+
+PAGINA_RECONCILIACAO = 1000
+
+
+def _paginas(objetos, tamanho: int):
+    pagina = []
+    for obj in objetos:
+        pagina.append(obj)
+        if len(pagina) == tamanho:
+            yield pagina
+            pagina = []
+    if pagina:
+        yield pagina
+
+
+def reconciliar(prefixo: str, idade_minima: timedelta, apagar: bool) -> int:
+    limite = datetime.now(timezone.utc) - idade_minima
+    total = 0
+
+    db = SessionLocal()
+    try:
+        for pagina in _paginas(get_storage().listar(prefixo), PAGINA_RECONCILIACAO):
+            # objetos recentes podem pertencer a um upload ainda em andamento
+            candidatos = [obj.key for obj in pagina if obj.modificado_em < limite]
+            if not candidatos:
+                continue
+
+            conhecidos = set(
+                db.scalars(
+                    select(Documento.bucket_key).where(
+                        Documento.bucket_key.in_(candidatos)
+                    )
+                )
+            )
+            orfaos = [key for key in candidatos if key not in conhecidos]
+
+            for key in orfaos:
+                print(key)
+                if apagar:
+                    enfileirar(db, "apagar_objeto_orfao", {"bucket_key": key})
+
+            if apagar:
+                db.commit()
+            total += len(orfaos)
+    finally:
+        db.close()
+
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Reconciliação de objetos órfãos no bucket.")
+    parser.add_argument("--prefixo", default="")
+    parser.add_argument("--idade-minima-horas", type=float, default=24)
+    parser.add_argument("--apagar", action="store_true")
+    args = parser.parse_args()
+
+    total = reconciliar(
+        args.prefixo,
+        timedelta(hours=args.idade_minima_horas),
+        args.apagar,
+    )
+    print(f"{total} objeto(s) órfão(s) encontrado(s).")
+
+
+if __name__ == "__main__":
+    main()
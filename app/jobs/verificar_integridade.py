@@ -0,0 +1,243 @@
+"""
+Verificação de integridade dos objetos armazenados.
+
+Percorre tb_documento em lotes ordenados por id (keyset) e, para cada
+documento, confere com um HEAD se o objeto existe e tem o tamanho
+esperado (o armazenado, para objetos comprimidos). Com --rehash, também
+relê o objeto e recalcula o SHA-256 do conteúdo original.
+
+O progresso é gravado num checkpoint ao fim de cada lote, então uma
+execução interrompida continua de onde parou. Quando uma passada chega ao
+fim da tabela, ela é marcada como concluída e a próxima execução começa
+uma passada nova do id 0. Cada passada grava as divergências num
+relatório JSONL próprio, com a data de início no nome (ex.:
+verificacao_relatorio_20240101-020000.jsonl). Pensado para rodar todo dia
+(cron), por exemplo:
+
+    python -m app.jobs.verificar_integridade --rehash --workers 16 --taxa 200
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.database.connection import SessionLocal
+from app.models.document import Documento
+from app.storage import get_storage
+from app.utils.compressao import LeitorDescomprimido
+
+REHASH_CHUNK_SIZE = 1024 * 1024
+
+
+class LimitadorTaxa:
+    """Token bucket simples: no máximo `taxa` requisições por segundo."""
+
+    def __init__(self, taxa: float):
+        self.taxa = taxa
+        self._tokens = taxa
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def aguardar(self) -> None:
+        if self.taxa <= 0:
+            return
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._tokens = min(self.taxa, self._tokens + (agora - self._ultimo) * self.taxa)
+                self._ultimo = agora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.taxa
+            time.sleep(espera)
+
+
+def _nova_passada(relatorio: Path) -> dict:
+    inicio = datetime.now()
+    return {
+        "ultimo_id": 0,
+        "verificados": 0,
+        "divergencias": 0,
+        "concluida": False,
+        "iniciada_em": inicio.isoformat(timespec="seconds"),
+        "relatorio": str(
+            relatorio.with_name(f"{relatorio.stem}_{inicio:%Y%m%d-%H%M%S}{relatorio.suffix}")
+        ),
+    }
+
+
+def _ler_checkpoint(caminho: Path, relatorio: Path, reiniciar: bool) -> dict:
+    """
+    Estado da passada em andamento, ou de uma nova se não houver checkpoint,
+    se a anterior terminou ou se `reiniciar`.
+    """
+    if not reiniciar and caminho.exists():
+        estado = json.loads(caminho.read_text())
+        if not estado.get("concluida"):
+            # checkpoints anteriores não guardavam o relatório da passada
+            estado.setdefault("relatorio", str(relatorio))
+            return estado
+    return _nova_passada(relatorio)
+
+
+def _gravar_checkpoint(caminho: Path, estado: dict) -> None:
+    tmp = caminho.with_suffix(caminho.suffix + ".tmp")
+    tmp.write_text(json.dumps(estado))
+    os.replace(tmp, caminho)
+
+
+def _sha256_objeto(key: str, compressao: Optional[str] = None) -> str:
+    stream = get_storage().get(key).stream
+    if compressao:
+        stream = LeitorDescomprimido(stream, compressao)
+    sha = hashlib.sha256()
+    try:
+        while chunk := stream.read(REHASH_CHUNK_SIZE):
+            sha.update(chunk)
+    finally:
+        stream.close()
+    return sha.hexdigest()
+
+
+def verificar_documento(doc, rehash: bool, limitador: LimitadorTaxa) -> Optional[dict]:
+    """Retorna a divergência encontrada para o documento, ou None se estiver íntegro."""
+    base = {"id": doc.id, "uuid": doc.uuid, "bucket_key": doc.bucket_key}
+    try:
+        limitador.aguardar()
+        tamanho = get_storage().head(doc.bucket_key)
+        if tamanho is None:
+            return {**base, "problema": "ausente"}
+        esperado = doc.tamanho_bytes if doc.tamanho_armazenado is None else doc.tamanho_armazenado
+        if tamanho != esperado:
+            return {
+                **base,
+                "problema": "tamanho_divergente",
+                "esperado": esperado,
+                "encontrado": tamanho,
+            }
+
+        if rehash and doc.hash_sha256:
+            limitador.aguardar()
+            calculado = _sha256_objeto(doc.bucket_key, doc.compressao)
+            if calculado != doc.hash_sha256:
+                return {
+                    **base,
+                    "problema": "hash_divergente",
+                    "esperado": doc.hash_sha256,
+                    "encontrado": calculado,
+                }
+    except Exception as e:
+        return {**base, "problema": "erro", "detalhe": str(e)}
+
+    return None
+
+
+def verificar(
+    lote: int,
+    rehash: bool,
+    workers: int,
+    taxa: float,
+    checkpoint: Path,
+    relatorio: Path,
+    cliente_id: Optional[int] = None,
+    reiniciar: bool = False,
+) -> dict:
+    estado = _ler_checkpoint(checkpoint, relatorio, reiniciar)
+    _gravar_checkpoint(checkpoint, estado)
+    limitador = LimitadorTaxa(taxa)
+
+    db = SessionLocal()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool, open(estado["relatorio"], "a") as saida:
+            while True:
+                stmt = (
+                    select(
+                        Documento.id,
+                        Documento.uuid,
+                        Documento.bucket_key,
+                        Documento.tamanho_bytes,
+                        Documento.hash_sha256,
+                        Documento.compressao,
+                        Documento.tamanho_armazenado,
+                    )
+                    .where(Documento.id > estado["ultimo_id"])
+                    .order_by(Documento.id)
+                    .limit(lote)
+                )
+                if cliente_id is not None:
+                    stmt = stmt.where(Documento.cliente_id == cliente_id)
+
+                docs = db.execute(stmt).all()
+                db.rollback()  # não segura a transação enquanto verifica
+                if not docs:
+                    estado["concluida"] = True
+                    _gravar_checkpoint(checkpoint, estado)
+                    break
+
+                for divergencia in pool.map(
+                    lambda doc: verificar_documento(doc, rehash, limitador),
+                    docs,
+                ):
+                    if divergencia is not None:
+                        saida.write(json.dumps(divergencia, ensure_ascii=False) + "\n")
+                        estado["divergencias"] += 1
+                saida.flush()
+
+                estado["ultimo_id"] = docs[-1].id
+                estado["verificados"] += len(docs)
+                _gravar_checkpoint(checkpoint, estado)
+    finally:
+        db.close()
+
+    return estado
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Verificação de integridade dos objetos armazenados.")
+    parser.add_argument("--lote", type=int, default=1000)
+    parser.add_argument("--rehash", action="store_true", help="relê e recalcula o SHA-256")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--taxa", type=float, default=100, help="requisições/s ao storage (0 = sem limite)")
+    parser.add_argument("--checkpoint", type=Path, default=Path("verificacao_checkpoint.json"))
+    parser.add_argument(
+        "--relatorio",
+        type=Path,
+        default=Path("verificacao_relatorio.jsonl"),
+        help="base do nome do relatório; cada passada acrescenta a data de início",
+    )
+    parser.add_argument("--cliente-id", type=int, default=None)
+    parser.add_argument(
+        "--reiniciar",
+        action="store_true",
+        help="abandona a passada em andamento e começa outra do início",
+    )
+    args = parser.parse_args()
+
+    estado = verificar(
+        args.lote,
+        args.rehash,
+        args.workers,
+        args.taxa,
+        args.checkpoint,
+        args.relatorio,
+        args.cliente_id,
+        args.reiniciar,
+    )
+    situacao = "concluída" if estado["concluida"] else "interrompida"
+    print(
+        f"Passada {situacao}: {estado['verificados']} documento(s) verificado(s), "
+        f"{estado['divergencias']} divergência(s). Relatório: {estado['relatorio']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
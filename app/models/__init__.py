@@ -1,4 +1,20 @@
 from .auth import Pessoa, Usuario, TokenBlacklist
-from .document import Documento, Tag
+from .document import Documento, Tag, TagChave
+from .estatistica import ClienteEstatistica, ClienteEstatisticaTipo
+from .outbox import OutboxEvento
+from .upload import UploadSessao
+from .versao import ClienteVersao
 
-__all__ = ["Pessoa", "Usuario", "TokenBlacklist", "Documento", "Tag"]
+__all__ = [
+    "Pessoa",
+    "Usuario",
+    "TokenBlacklist",
+    "Documento",
+    "Tag",
+    "TagChave",
+    "ClienteEstatistica",
+    "ClienteEstatisticaTipo",
+    "OutboxEvento",
+    "UploadSessao",
+    "ClienteVersao",
+]
@@ -5,9 +5,12 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
+    Integer,
     String,
     Text,
 )
+from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import relationship
 
 from app.database.connection import Base
@@ -19,11 +22,15 @@ class Documento(Base):
     id = Column(BigInteger, primary_key=True, index=True)
     uuid = Column(String(12), unique=True, nullable=False, index=True)
     cliente_id = Column(BigInteger, nullable=False, index=True)
-    bucket_key = Column(Text, nullable=False)
+    bucket_key = Column(Text, nullable=False, index=True)
     filename = Column(Text, nullable=False)
     content_type = Column(String(100), nullable=False)
     tamanho_bytes = Column(BigInteger, nullable=False)
     hash_sha256 = Column(String(64), nullable=True)
+    # compressão aplicada ao objeto no storage ("zstd"/"gzip") e o tamanho
+    # dele lá; tamanho_bytes e hash_sha256 descrevem sempre o original
+    compressao = Column(String(10), nullable=True)
+    tamanho_armazenado = Column(BigInteger, nullable=True)
     criado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     tags = relationship(
@@ -34,6 +41,15 @@ class Documento(Base):
     )
 
 
+class TagChave(Base):
+    """Dicionário de chaves de tag: cada chave distinta é gravada uma vez."""
+
+    __tablename__ = "tb_tag_chave"
+
+    id = Column(Integer, primary_key=True)
+    chave = Column(String(100), unique=True, nullable=False)
+
+
 class Tag(Base):
     __tablename__ = "tb_tags"
 
@@ -44,7 +60,25 @@ class Tag(Base):
         nullable=False,
         index=True,
     )
-    chave = Column(String(100), nullable=False, index=True)
-    valor = Column(Text, nullable=False, index=True)
+    # cópia de Documento.cliente_id: permite particionar tb_tags junto com
+    # tb_documento e filtrar tags por cliente sem join
+    cliente_id = Column(BigInteger, nullable=False, index=True)
+    chave_id = Column(
+        Integer,
+        ForeignKey("tb_tag_chave.id"),
+        nullable=False,
+        index=True,
+    )
+    valor = Column(Text, nullable=False)
 
     documento = relationship("Documento", back_populates="tags")
+    chave_ref = relationship("TagChave", lazy="joined")
+    # somente leitura: na gravação informe chave_id (app.utils.tag_chaves)
+    chave = association_proxy("chave_ref", "chave")
+
+    __table_args__ = (
+        # valor é texto livre e só é buscado por igualdade (ou ILIKE, que
+        # não usa índice B-tree): hash indexa um inteiro de 4 bytes por
+        # linha em vez do texto inteiro
+        Index("ix_tb_tags_valor_hash", valor, postgresql_using="hash"),
+    )
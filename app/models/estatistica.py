@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, String
+
+from app.database.connection import Base
+
+
+class ClienteEstatistica(Base):
+    """
+    Totais de documentos por cliente, mantidos na mesma transação dos
+    uploads e remoções (app.utils.estatisticas) para não exigir
+    COUNT/SUM sobre tb_documento.
+    """
+
+    __tablename__ = "tb_cliente_estatistica"
+
+    cliente_id = Column(BigInteger, primary_key=True)
+    total_documentos = Column(BigInteger, nullable=False, default=0)
+    total_bytes = Column(BigInteger, nullable=False, default=0)
+    ultimo_upload_em = Column(DateTime, nullable=True)
+    atualizado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ClienteEstatisticaTipo(Base):
+    __tablename__ = "tb_cliente_estatistica_tipo"
+
+    cliente_id = Column(BigInteger, primary_key=True)
+    content_type = Column(String(100), primary_key=True)
+    total_documentos = Column(BigInteger, nullable=False, default=0)
+    total_bytes = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    Text,
+)
+
+from app.database.connection import Base
+
+
+class OutboxEvento(Base):
+    """
+    Efeito colateral no bucket registrado na mesma transação da alteração
+    em tb_documento e executado depois pelo worker (app.jobs.outbox_worker).
+    """
+
+    __tablename__ = "tb_outbox"
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    tipo = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String(20), nullable=False, default="pendente")
+    tentativas = Column(Integer, nullable=False, default=0)
+    disponivel_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+    ultimo_erro = Column(Text, nullable=True)
+    criado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_tb_outbox_status_disponivel_em", "status", "disponivel_em"),
+    )
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Column,
+    DateTime,
+    LargeBinary,
+    String,
+    Text,
+)
+
+from app.database.connection import Base
+
+
+class UploadSessao(Base):
+    """
+    Upload retomável em andamento (app.routes.upload_retomavel). Cada PATCH
+    recebido vira uma parte do envio multipart no storage; `recebido`,
+    `partes` e o estado do SHA-256 avançam juntos, só depois que a parte
+    foi gravada. Enquanto uma requisição fala com o storage, a sessão fica
+    reservada para ela (`reservada_por`, até `reservada_ate`).
+    """
+
+    __tablename__ = "tb_upload_sessao"
+
+    id = Column(String(32), primary_key=True)
+    uuid = Column(String(12), nullable=False, unique=True)
+    cliente_id = Column(BigInteger, nullable=False, index=True)
+    bucket_key = Column(Text, nullable=False)
+    filename = Column(Text, nullable=False)
+    content_type = Column(String(100), nullable=False)
+    tags = Column(JSON, nullable=False, default=list)
+    tamanho_total = Column(BigInteger, nullable=False)
+    recebido = Column(BigInteger, nullable=False, default=0)
+    multipart_id = Column(Text, nullable=False)
+    partes = Column(JSON, nullable=False, default=list)
+    sha256_estado = Column(LargeBinary, nullable=False)
+    criado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expira_em = Column(DateTime, nullable=False, index=True)
+    concluido_em = Column(DateTime, nullable=True)
+    reservada_por = Column(String(32), nullable=True)
+    reservada_ate = Column(DateTime, nullable=True)
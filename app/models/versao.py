@@ -0,0 +1,16 @@
+from sqlalchemy import BigInteger, Column
+
+from app.database.connection import Base
+
+
+class ClienteVersao(Base):
+    """
+    Contador de alterações por cliente, incrementado na mesma transação de
+    toda escrita em documentos/tags do cliente (app.utils.versoes). Serve
+    de base para o ETag das listagens.
+    """
+
+    __tablename__ = "tb_cliente_versao"
+
+    cliente_id = Column(BigInteger, primary_key=True)
+    versao = Column(BigInteger, nullable=False, default=0)
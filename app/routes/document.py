@@ -1,30 +1,86 @@
 from datetime import datetime
 from pathlib import Path
-import hashlib
+import csv
+import io
 import secrets
 import string
 import os
 from typing import Any
 
-import boto3
+import orjson
 from typing import Any, List, Optional
-from sqlalchemy import func
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Response, UploadFile, status
-from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, func, select
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Query, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session, joinedload
 from pydantic import ValidationError
 
-from app.database.connection import get_db
+from app.database.connection import SessionLocal, get_db
 from app.models.document import Documento, Tag
-from app.schemas.document import DocumentoOut, DocumentoUploadMeta, DocumentoUpdate
+from app.models.estatistica import ClienteEstatistica, ClienteEstatisticaTipo
+from app.models.outbox import OutboxEvento
+from app.schemas.document import (
+    DocumentoOut,
+    DocumentoSelecao,
+    DocumentoUpdate,
+    DocumentoUploadMeta,
+    DocumentosBulkDeleteOut,
+    EstatisticasClienteOut,
+    TagsBulkIn,
+    TagsBulkOut,
+)
+from app.utils.documentos import (
+    DOCUMENTO_COLUNAS,
+    META_COLUNAS,
+    aplicar_diff_tags,
+    aplicar_operacoes_tags,
+    condicoes_selecao,
+    documentos_com_tags,
+    filtros_documento,
+    registrar_documento,
+)
+from app.utils.downloads import (
+    DOWNLOAD_QUEUE_TIMEOUT_SECONDS,
+    FinalizandoStreamingResponse,
+    ObjetoStreamingResponse,
+    limite_downloads,
+)
+from app.storage import get_storage
+from app.storage.cache import download_cache
+from app.utils.compressao import (
+    LeitorComprimido,
+    aceita_codificacao,
+    descomprimir,
+    escolher_compressao,
+)
+from app.utils.estatisticas import registrar_remocoes
+from app.utils.metadados_cache import DocumentoMeta, metadados_cache
+from app.utils.outbox import enfileirar
+from app.utils.serialization import OrjsonResponse
+from app.utils.streams import LeitorComHash
+from app.utils.tag_chaves import chaves_tag
+from app.utils.uploads import admissao_uploads
+from app.utils.versoes import etag_confere, gerar_etag, incrementar_versoes, versao_atual
+from app.utils.zip_stream import MembroZip, gerar_zip
 
 router = APIRouter()
 
-S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME", "")
-if not S3_BUCKET_NAME:
-    raise RuntimeError("S3_BUCKET_NAME não configurado no .env")
+storage = get_storage()
+
+# Prazo até o worker do outbox apagar o objeto de um upload que não
+# chegou a gravar o Documento (queda entre o PUT e o commit).
+UPLOAD_ORPHAN_GRACE_SECONDS = int(os.getenv("UPLOAD_ORPHAN_GRACE_SECONDS", "3600"))
 
-s3_client = boto3.client("s3")
+# delete_objects do S3 aceita no máximo 1000 chaves por chamada
+BULK_DELETE_BATCH_SIZE = 1000
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+EXPORT_CSV_CAMPOS = [coluna.key for coluna in DOCUMENTO_COLUNAS] + ["tags"]
+
+ZIP_MAX_DOCUMENTOS = int(os.getenv("ZIP_MAX_DOCUMENTOS", "10000"))
+
+PRESIGN_EXPIRES_SECONDS = int(os.getenv("PRESIGN_EXPIRES_SECONDS", "300"))
 
 
 def generate_uuid12() -> str:
@@ -40,6 +96,8 @@ def generate_uuid12() -> str:
 async def upload_document(
     meta: str = Form(...),
     file: UploadFile = File(...),
+    x_cliente_id: Optional[int] = Header(None),
+    cliente_id: Optional[int] = Query(None),
     db: Session = Depends(get_db),
 ) -> Any:
     try:
@@ -50,29 +108,47 @@ async def upload_document(
             detail=f"Erro ao validar meta: {e.errors()}",
         )
 
+    # o orçamento de uploads (AdmissaoUploadsMiddleware) foi cobrado do
+    # cliente informado em X-Cliente-Id/cliente_id (opcional; sem ele o
+    # upload conta no orçamento compartilhado de AdmissaoUploadsMiddleware)
+    informado = x_cliente_id if x_cliente_id is not None else cliente_id
+    if informado is not None and informado != meta_obj.cliente_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="O cliente_id do meta difere do informado em X-Cliente-Id/cliente_id.",
+        )
+
     if not file.filename:
         raise HTTPException(status_code=400, detail="Arquivo sem nome.")
 
-    hoje_str = datetime.utcnow().strftime("%Y-%m-%d")
+    agora = datetime.utcnow()
+    hoje_str = agora.strftime("%Y-%m-%d")
     uuid12 = generate_uuid12()
 
     ext = Path(file.filename).suffix.lower()
     bucket_key = f"{meta_obj.cliente_id}/{hoje_str}/{uuid12}{ext}"
 
-    content = await file.read()
-    tamanho_bytes = len(content)
-
-    import base64
+    content_type = file.content_type or "application/octet-stream"
 
-    file_base64 = base64.b64encode(content).decode("utf-8")
-    hash_sha256 = hashlib.sha256(content).hexdigest() if tamanho_bytes > 0 else None
+    # Registra antes do PUT a limpeza do objeto caso o Documento não seja
+    # gravado; o evento é descartado na mesma transação do Documento.
+    guarda = enfileirar(
+        db,
+        "apagar_objeto_orfao",
+        {"bucket_key": bucket_key},
+        atraso_segundos=UPLOAD_ORPHAN_GRACE_SECONDS,
+    )
+    db.commit()
+    guarda_id = guarda.id
+
+    # O arquivo segue em streaming do temporário do upload para o storage;
+    # hash e tamanho do original são calculados na mesma passada, antes da
+    # compressão (quando o tipo e uma amostra do conteúdo justificam).
+    compressao = await run_in_threadpool(escolher_compressao, file.file, content_type)
+    leitor = LeitorComHash(file.file)
+    fonte = LeitorComprimido(leitor, compressao) if compressao else leitor
     try:
-        s3_client.put_object(
-            Bucket=S3_BUCKET_NAME,
-            Key=bucket_key,
-            Body=content,
-            ContentType=file.content_type or "application/octet-stream",
-        )
+        await run_in_threadpool(storage.put_stream, bucket_key, fonte, content_type)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -84,25 +160,26 @@ async def upload_document(
         cliente_id=meta_obj.cliente_id,
         bucket_key=bucket_key,
         filename=file.filename,
-        content_type=file.content_type or "application/octet-stream",
-        tamanho_bytes=tamanho_bytes,
-        hash_sha256=hash_sha256,
+        content_type=content_type,
+        tamanho_bytes=leitor.tamanho,
+        hash_sha256=leitor.hexdigest() if leitor.tamanho > 0 else None,
+        compressao=compressao,
+        tamanho_armazenado=fonte.tamanho,
+        criado_em=agora,
     )
 
-    for tag in meta_obj.tags:
-        documento.tags.append(
-            Tag(
-                chave=tag.chave,
-                valor=tag.valor,
-            )
-        )
-
-    db.add(documento)
+    registrar_documento(db, documento, meta_obj.tags)
+    db.execute(delete(OutboxEvento).where(OutboxEvento.id == guarda_id))
     db.commit()
     db.refresh(documento)
 
     return documento
 
+def _cabecalhos_cache(etag: str) -> dict:
+    # no-cache: o navegador guarda a resposta mas revalida a cada uso
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
 @router.get(
     "/search",
     response_model=List[DocumentoOut],
@@ -112,77 +189,363 @@ def search_documents(
     tag_chave: Optional[str] = None,
     tag_valor: Optional[str] = None,
     q: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
 ) -> Any:
-    query = db.query(Documento).options(joinedload(Documento.tags))
+    # A versão é lida antes da busca: se algo mudar no meio, o ETag fica
+    # mais velho que o conteúdo e a próxima consulta traz tudo de novo.
+    etag = gerar_etag(
+        "search", versao_atual(db, cliente_id), cliente_id, tag_chave, tag_valor, q
+    )
+    if etag_confere(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_cabecalhos_cache(etag))
+
+    # Seleciona só as colunas e serializa direto com orjson: evita montar
+    # objetos ORM e revalidar cada linha em DocumentoOut/TagOut.
+    rows = db.execute(
+        select(*DOCUMENTO_COLUNAS)
+        .where(*filtros_documento(cliente_id, tag_chave, tag_valor, q))
+        .order_by(Documento.criado_em.desc())
+    ).all()
+
+    return OrjsonResponse(
+        documentos_com_tags(db, rows, cliente_id),
+        headers=_cabecalhos_cache(etag),
+    )
 
-    if cliente_id is not None:
-        query = query.filter(Documento.cliente_id == cliente_id)
 
-    if tag_chave is not None or tag_valor is not None or q is not None:
-        query = query.join(Tag)
+def _exportar_lotes(cliente_id: int):
+    """
+    Percorre os documentos do cliente com um cursor no servidor
+    (stream_results/yield_per) e entrega um lote por vez, já com as tags
+    do lote carregadas numa única consulta.
 
-        if tag_chave is not None:
-            query = query.filter(Tag.chave == tag_chave)
+    Usa uma sessão própria porque o gerador roda durante o envio da
+    resposta, depois que a dependência get_db já pode ter sido encerrada.
+    """
+    db = SessionLocal()
+    try:
+        stmt = (
+            select(*DOCUMENTO_COLUNAS)
+            .where(*filtros_documento(cliente_id=cliente_id))
+            .order_by(Documento.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        result = db.execute(stmt)
+        for lote in result.partitions():
+            yield documentos_com_tags(db, lote, cliente_id)
+    finally:
+        db.close()
+
+
+def _exportar_ndjson(cliente_id: int):
+    for lote in _exportar_lotes(cliente_id):
+        yield b"".join(orjson.dumps(doc) + b"\n" for doc in lote)
+
+
+def _exportar_csv(cliente_id: int):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_CSV_CAMPOS)
+    writer.writeheader()
+
+    for lote in _exportar_lotes(cliente_id):
+        for doc in lote:
+            doc["criado_em"] = doc["criado_em"].isoformat()
+            doc["tags"] = orjson.dumps(
+                [{"chave": tag["chave"], "valor": tag["valor"]} for tag in doc["tags"]]
+            ).decode("utf-8")
+            writer.writerow(doc)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+@router.get("/export")
+def export_documents(
+    cliente_id: int,
+    formato: str = "ndjson",
+) -> StreamingResponse:
+    """
+    Exporta o catálogo de metadados de um cliente em NDJSON ou CSV.
+    O consumo de memória é constante: as linhas saem do cursor em lotes
+    de EXPORT_BATCH_SIZE e são enviadas à medida que são lidas.
+    """
+    if formato == "ndjson":
+        conteudo = _exportar_ndjson(cliente_id)
+        media_type = "application/x-ndjson"
+    elif formato == "csv":
+        conteudo = _exportar_csv(cliente_id)
+        media_type = "text/csv; charset=utf-8"
+    else:
+        raise HTTPException(
+            status_code=400,
+            detail="Formato inválido. Use 'ndjson' ou 'csv'.",
+        )
 
-        if tag_valor is not None:
-            query = query.filter(Tag.valor == tag_valor)
+    return StreamingResponse(
+        conteudo,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="documentos_{cliente_id}.{formato}"'
+        },
+    )
 
-        if q is not None:
-            like_pattern = f"%{q}%"
-            query = query.filter(Tag.valor.ilike(like_pattern))
+def _buscar_meta(db: Session, uuid: str) -> Optional[DocumentoMeta]:
+    """
+    Metadados necessários para servir o download, pelo cache em memória ou
+    por uma consulta só com as colunas usadas (sem tags).
+    """
+    meta = metadados_cache.get(uuid)
+    if meta is not None:
+        return meta
+
+    row = db.execute(
+        select(*META_COLUNAS).where(Documento.uuid == uuid)
+    ).first()
+    if row is None:
+        return None
+
+    meta = DocumentoMeta(*row)
+    metadados_cache.set(uuid, meta)
+    return meta
+
+
+def _abrir_para_download(documento: DocumentoMeta):
+    """Abre o objeto pelo cache em disco, quando habilitado, ou direto do storage."""
+    if (
+        download_cache is not None
+        and documento.bytes_armazenados <= download_cache.max_objeto_bytes
+    ):
+        obj = download_cache.obter(
+            documento.bucket_key,
+            documento.hash_sha256,
+            lambda: storage.get(documento.bucket_key),
+        )
+        if obj is not None:
+            return obj
 
-        query = query.distinct()
+    return storage.get(documento.bucket_key)
 
-    documentos = query.order_by(Documento.criado_em.desc()).all()
-    return documentos
 
 @router.get(
     "/{uuid}/download",
 )
-def download_document(
+async def download_document(
     uuid: str,
+    accept_encoding: Optional[str] = Header(None),
     db: Session = Depends(get_db),
-) -> StreamingResponse:
-    documento = (
-        db.query(Documento)
-        .options(joinedload(Documento.tags))
-        .filter(Documento.uuid == uuid)
-        .first()
-    )
+) -> Response:
+    documento = await run_in_threadpool(_buscar_meta, db, uuid)
 
     if not documento:
         raise HTTPException(status_code=404, detail="Documento não encontrado.")
 
-    try:
-        obj = s3_client.get_object(
-            Bucket=S3_BUCKET_NAME,
-            Key=documento.bucket_key,
+    # Objeto comprimido: vai como está, com Content-Encoding, se o cliente
+    # aceita o algoritmo; senão é descomprimido em streaming.
+    headers = {"Content-Disposition": f'attachment; filename="{documento.filename}"'}
+    repassar = False
+    if documento.compressao:
+        headers["Vary"] = "Accept-Encoding"
+        repassar = aceita_codificacao(accept_encoding, documento.compressao)
+        if repassar:
+            headers["Content-Encoding"] = documento.compressao
+
+    # Backend local: o servidor envia o arquivo direto do disco
+    # (sendfile/pathsend quando disponível), sem os bytes passarem por Python.
+    caminho = storage.local_path(documento.bucket_key)
+    if caminho is not None and (not documento.compressao or repassar):
+        if not caminho.is_file():
+            raise HTTPException(
+                status_code=500,
+                detail="Falha ao buscar arquivo no bucket: arquivo não encontrado.",
+            )
+        return FileResponse(
+            caminho,
+            media_type=documento.content_type or "application/octet-stream",
+            filename=documento.filename,
+            headers={k: v for k, v in headers.items() if k != "Content-Disposition"},
         )
+
+    if not await limite_downloads.adquirir(DOWNLOAD_QUEUE_TIMEOUT_SECONDS):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Muitos downloads simultâneos. Tente novamente em instantes.",
+            headers={"Retry-After": "1"},
+        )
+
+    try:
+        obj = await run_in_threadpool(_abrir_para_download, documento)
+        if not repassar:
+            obj = descomprimir(obj, documento.compressao, documento.tamanho_bytes)
     except Exception as e:
+        limite_downloads.liberar()
         raise HTTPException(
             status_code=500,
             detail=f"Falha ao buscar arquivo no bucket: {e}",
         )
 
-    body = obj["Body"]
+    return ObjetoStreamingResponse(
+        obj,
+        ao_terminar=limite_downloads.liberar,
+        media_type=documento.content_type or "application/octet-stream",
+        headers={**headers, "Content-Length": str(obj.tamanho)},
+    )
+
+@router.post(
+    "/download-zip",
+)
+async def download_zip(
+    payload: DocumentoSelecao,
+    db: Session = Depends(get_db),
+) -> Response:
+    """
+    Baixa num único ZIP, gerado em streaming, os documentos selecionados
+    por uuids ou pelos mesmos filtros da busca.
+    """
+    membros = await run_in_threadpool(
+        lambda: db.execute(
+            select(
+                Documento.filename,
+                Documento.bucket_key,
+                Documento.content_type,
+                Documento.tamanho_bytes,
+                Documento.criado_em,
+                Documento.compressao,
+            )
+            .where(*condicoes_selecao(payload))
+            .order_by(Documento.criado_em.desc())
+            .limit(ZIP_MAX_DOCUMENTOS + 1)
+        ).all()
+    )
 
-    def iterfile():
-        for chunk in body.iter_chunks(chunk_size=8192):
-            if chunk:
-                yield chunk
+    if not membros:
+        raise HTTPException(status_code=404, detail="Nenhum documento encontrado.")
 
-    return StreamingResponse(
-        iterfile(),
-        media_type=documento.content_type or "application/octet-stream",
-        headers={
-            "Content-Disposition": f'attachment; filename="{documento.filename}"'
-        },
+    if len(membros) > ZIP_MAX_DOCUMENTOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A seleção excede o limite de {ZIP_MAX_DOCUMENTOS} documentos por ZIP.",
+        )
+
+    if not await limite_downloads.adquirir(DOWNLOAD_QUEUE_TIMEOUT_SECONDS):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Muitos downloads simultâneos. Tente novamente em instantes.",
+            headers={"Retry-After": "1"},
+        )
+
+    nome = f"documentos_{datetime.utcnow():%Y%m%d%H%M%S}.zip"
+    return FinalizandoStreamingResponse(
+        gerar_zip((MembroZip(*membro) for membro in membros), storage.get),
+        ao_terminar=limite_downloads.liberar,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{nome}"'},
     )
 
+@router.get("/{uuid}/url")
+def presigned_url_document(
+    uuid: str,
+    response: Response,
+    accept_encoding: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Gera uma URL temporária para download direto do storage, quando o
+    backend configurado oferece esse recurso (S3).
+
+    O storage entrega os bytes como estão gravados: um documento comprimido
+    só tem URL se o Accept-Encoding do cliente aceita o algoritmo; caso
+    contrário a resposta é 409 e o download deve ir por /download, que
+    descomprime.
+    """
+    documento = (
+        db.query(Documento.bucket_key, Documento.filename, Documento.compressao)
+        .filter(Documento.uuid == uuid)
+        .first()
+    )
+
+    if not documento:
+        raise HTTPException(status_code=404, detail="Documento não encontrado.")
+
+    response.headers["Vary"] = "Accept-Encoding"
+    if documento.compressao and not aceita_codificacao(accept_encoding, documento.compressao):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=(
+                f"Documento armazenado com compressão {documento.compressao}, não aceita "
+                f"pelo Accept-Encoding do cliente. Use /documents/{uuid}/download."
+            ),
+            headers={"Vary": "Accept-Encoding"},
+        )
+
+    url = storage.presign(
+        documento.bucket_key,
+        PRESIGN_EXPIRES_SECONDS,
+        filename=documento.filename,
+        content_encoding=documento.compressao,
+    )
+    if url is None:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="O storage configurado não gera URLs de download.",
+        )
+
+    return {"url": url, "expira_em_segundos": PRESIGN_EXPIRES_SECONDS}
+
+@router.get(
+    "/stats",
+    response_model=EstatisticasClienteOut,
+)
+def estatisticas_cliente(
+    cliente_id: int,
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Quantidade de documentos e armazenamento usado pelo cliente, lidos das
+    tabelas de estatísticas (consulta por chave primária, sem varrer
+    tb_documento).
+    """
+    total = db.get(ClienteEstatistica, cliente_id)
+    por_tipo = db.execute(
+        select(
+            ClienteEstatisticaTipo.content_type,
+            ClienteEstatisticaTipo.total_documentos,
+            ClienteEstatisticaTipo.total_bytes,
+        )
+        .where(
+            ClienteEstatisticaTipo.cliente_id == cliente_id,
+            ClienteEstatisticaTipo.total_documentos > 0,
+        )
+        .order_by(ClienteEstatisticaTipo.content_type)
+    ).all()
+
+    return {
+        "cliente_id": cliente_id,
+        "total_documentos": total.total_documentos if total else 0,
+        "total_bytes": total.total_bytes if total else 0,
+        "ultimo_upload_em": total.ultimo_upload_em if total else None,
+        "por_content_type": [row._asdict() for row in por_tipo],
+    }
+
+@router.get("/metrics")
+def metricas_documentos():
+    """Métricas deste worker: downloads em andamento e caches."""
+    return {
+        "downloads": limite_downloads.metricas(),
+        "uploads": admissao_uploads.metricas(),
+        "cache": download_cache.metricas() if download_cache is not None else None,
+        "metadados": metadados_cache.metricas(),
+        "tag_chaves": chaves_tag.metricas(),
+    }
+
 @router.get("/tags")
 def listar_tags_disponiveis(
+    response: Response,
     cliente_id: int | None = None,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
 ):
     """
@@ -191,22 +554,47 @@ def listar_tags_disponiveis(
     Exemplo de retorno:
     { "tags": ["tipo", "cpf", "competencia"] }
     """
+    etag = gerar_etag("tags", versao_atual(db, cliente_id), cliente_id)
+    if etag_confere(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_cabecalhos_cache(etag))
+    response.headers.update(_cabecalhos_cache(etag))
 
-    query = db.query(Tag.chave).distinct()
+    query = db.query(Tag.chave_id).distinct()
 
     if cliente_id is not None:
-        query = (
-            db.query(Tag.chave)
-            .join(Documento, Documento.id == Tag.documento_id)
-            .filter(Documento.cliente_id == cliente_id)
-            .distinct()
-        )
+        # Tag.cliente_id dispensa o join e restringe a leitura à partição
+        # do cliente quando as tabelas estão particionadas
+        query = query.filter(Tag.cliente_id == cliente_id)
 
-    rows = query.order_by(Tag.chave).all()
-    tags = [row[0] for row in rows]
+    nomes = chaves_tag.nomes(db, (row[0] for row in query.all()))
+    tags = sorted(nomes.values())
 
     return {"tags": tags}
 
+@router.post(
+    "/tags/bulk",
+    response_model=TagsBulkOut,
+)
+def bulk_update_tags(
+    payload: TagsBulkIn,
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Aplica operações de tag (add/remove/replace) a todos os documentos
+    selecionados por uuids ou filtro, numa única transação.
+    """
+    condicoes = condicoes_selecao(payload)
+    cliente_id = payload.filtro.cliente_id if payload.filtro else None
+    resultado = aplicar_operacoes_tags(db, condicoes, payload.operacoes, cliente_id=cliente_id)
+
+    # clientes dos documentos selecionados antes das alterações
+    clientes = resultado.pop("clientes")
+    if resultado["inseridas"] or resultado["removidas"]:
+        incrementar_versoes(db, clientes)
+    db.commit()
+
+    return resultado
+
 @router.put(
     "/{uuid}/update",
     response_model=DocumentoOut,
@@ -230,16 +618,82 @@ def update_document(
         documento.filename = payload.filename
 
     if payload.tags is not None:
-        documento.tags.clear()
-        for tag in payload.tags:
-            documento.tags.append(Tag(chave=tag.chave, valor=tag.valor))
+        aplicar_diff_tags(db, documento, payload.tags)
 
     db.add(documento)
+    incrementar_versoes(db, [documento.cliente_id])
     db.commit()
     db.refresh(documento)
 
+    metadados_cache.invalidar(uuid)
+
     return documento
 
+@router.post(
+    "/bulk-delete",
+    response_model=DocumentosBulkDeleteOut,
+)
+def bulk_delete_documents(
+    payload: DocumentoSelecao,
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Remove em massa os documentos selecionados por uuids ou filtro.
+
+    Cada lote de ids é uma transação própria: DELETE ... RETURNING das
+    linhas (as tags saem pelo ON DELETE CASCADE) e um evento
+    "apagar_objetos" no outbox com as chaves do lote, confirmados juntos.
+    Os objetos saem do storage depois, pelo worker do outbox (delete_objects,
+    no S3); uma queda no meio deixa os lotes anteriores completos e nenhuma
+    linha apontando para objeto já apagado.
+    """
+    alvos = db.execute(
+        select(Documento.id, Documento.cliente_id).where(*condicoes_selecao(payload))
+    ).all()
+
+    removidos = 0
+    eventos = []
+    for i in range(0, len(alvos), BULK_DELETE_BATCH_SIZE):
+        lote = alvos[i:i + BULK_DELETE_BATCH_SIZE]
+        apagados = db.execute(
+            delete(Documento)
+            .where(
+                # cliente_id explícito para podar partições de tb_documento
+                Documento.cliente_id.in_({alvo.cliente_id for alvo in lote}),
+                Documento.id.in_([alvo.id for alvo in lote]),
+            )
+            .returning(
+                Documento.uuid,
+                Documento.bucket_key,
+                Documento.cliente_id,
+                Documento.content_type,
+                Documento.tamanho_bytes,
+            )
+            .execution_options(synchronize_session=False)
+        ).all()
+        if not apagados:
+            continue
+
+        registrar_remocoes(
+            db,
+            [(row.cliente_id, row.content_type, row.tamanho_bytes) for row in apagados],
+        )
+        incrementar_versoes(db, {row.cliente_id for row in apagados})
+        evento = enfileirar(
+            db, "apagar_objetos", {"bucket_keys": [row.bucket_key for row in apagados]}
+        )
+        db.flush()
+        eventos.append(evento.id)
+        db.commit()
+
+        removidos += len(apagados)
+        for row in apagados:
+            metadados_cache.invalidar(row.uuid)
+            if download_cache is not None:
+                download_cache.invalidar(row.bucket_key)
+
+    return {"removidos": removidos, "eventos": eventos}
+
 @router.delete(
     "/{uuid}/delete",
     status_code=status.HTTP_204_NO_CONTENT,
@@ -248,27 +702,36 @@ def delete_document(
     uuid: str,
     db: Session = Depends(get_db),
 ) -> Response:
-    documento = (
-        db.query(Documento)
-        .filter(Documento.uuid == uuid)
-        .first()
-    )
+    # Um único DELETE ... RETURNING localiza e remove o documento; as tags
+    # saem pelo ON DELETE CASCADE.
+    apagado = db.execute(
+        delete(Documento)
+        .where(Documento.uuid == uuid)
+        .returning(
+            Documento.bucket_key,
+            Documento.cliente_id,
+            Documento.content_type,
+            Documento.tamanho_bytes,
+        )
+        .execution_options(synchronize_session=False)
+    ).first()
 
-    if not documento:
+    if apagado is None:
         raise HTTPException(status_code=404, detail="Documento não encontrado.")
 
-    try:
-        s3_client.delete_object(
-            Bucket=S3_BUCKET_NAME,
-            Key=documento.bucket_key,
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Falha ao apagar arquivo no bucket: {e}",
-        )
+    bucket_key = apagado.bucket_key
+    registrar_remocoes(
+        db, [(apagado.cliente_id, apagado.content_type, apagado.tamanho_bytes)]
+    )
+    incrementar_versoes(db, [apagado.cliente_id])
 
-    db.delete(documento)
+    # O objeto é apagado pelo worker do outbox; o evento é gravado na mesma
+    # transação que remove o documento.
+    enfileirar(db, "apagar_objeto", {"bucket_key": bucket_key})
     db.commit()
 
+    metadados_cache.invalidar(uuid)
+    if download_cache is not None:
+        download_cache.invalidar(bucket_key)
+
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,509 @@
+"""
+Upload retomável no estilo do protocolo tus (https://tus.io), para
+arquivos grandes enviados por links instáveis:
+
+    POST   /documents/uploads        cria a sessão (Upload-Length, Upload-Metadata)
+    HEAD   /documents/uploads/{id}   offset atual (Upload-Offset), para retomar
+    PATCH  /documents/uploads/{id}   envia um pedaço a partir de Upload-Offset
+    DELETE /documents/uploads/{id}   desiste do upload
+
+Cada PATCH vira uma parte do envio multipart no storage; por isso todo
+pedaço, menos o último, precisa ter ao menos `parte_minima` bytes
+(informado na criação). Um PATCH interrompido não avança o offset: o
+cliente consulta o HEAD e reenvia a partir dali. O PATCH que completa o
+arquivo cria o Documento e responde 200 com ele.
+
+O banco e o storage são acessados só fora do event loop. Durante uma
+chamada ao storage a sessão fica reservada (reservada_por/reservada_ate),
+não travada: a linha só é travada por instantes, para reservar e depois
+para registrar o resultado. Outro PATCH ou DELETE na mesma sessão recebe
+409 enquanto a reserva vale.
+"""
+import base64
+import binascii
+import math
+import os
+import secrets
+import tempfile
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.orm import Session
+
+from app.database.connection import get_db
+from app.models.document import Documento
+from app.models.upload import UploadSessao
+from app.routes.document import generate_uuid12
+from app.schemas.document import DocumentoOut, DocumentoUploadMeta, TagCreate
+from app.storage import MULTIPART_MAX_PARTES, MULTIPART_PARTE_MINIMA, get_storage
+from app.utils.documentos import registrar_documento
+from app.utils.serialization import OrjsonResponse
+from app.utils.sha256_retomavel import Sha256Retomavel
+from app.utils.uploads import UPLOAD_QUEUE_TIMEOUT_SECONDS, admissao_uploads, recusa_upload
+
+router = APIRouter()
+
+storage = get_storage()
+
+TUS_VERSAO = "1.0.0"
+
+UPLOAD_RETOMAVEL_MAX_BYTES = int(os.getenv("UPLOAD_RETOMAVEL_MAX_BYTES", str(100 * 1024**3)))
+UPLOAD_RETOMAVEL_PARTE_MAX_BYTES = int(
+    os.getenv("UPLOAD_RETOMAVEL_PARTE_MAX_BYTES", str(256 * 1024**2))
+)
+# Prazo de inatividade: cada PATCH aceito renova a sessão.
+UPLOAD_RETOMAVEL_TTL_SECONDS = int(os.getenv("UPLOAD_RETOMAVEL_TTL_SECONDS", str(24 * 3600)))
+# Pedaços maiores que isso são recebidos em arquivo temporário.
+UPLOAD_RETOMAVEL_SPOOL_BYTES = int(os.getenv("UPLOAD_RETOMAVEL_SPOOL_BYTES", str(8 * 1024**2)))
+# Validade da reserva da sessão durante uma chamada ao storage; vencida,
+# outra requisição pode assumir (por exemplo, se o worker caiu no meio).
+UPLOAD_RETOMAVEL_RESERVA_SECONDS = int(os.getenv("UPLOAD_RETOMAVEL_RESERVA_SECONDS", "900"))
+
+# O corpo do PATCH vai para o temporário e para o SHA-256 em blocos deste
+# tamanho, numa thread.
+_BLOCO_BYTES = 1024**2
+
+_TAGS = TypeAdapter(list[TagCreate])
+
+
+def _parte_minima(tamanho_total: int) -> int:
+    return max(MULTIPART_PARTE_MINIMA, math.ceil(tamanho_total / MULTIPART_MAX_PARTES))
+
+
+def _ler_metadata(valor: Optional[str]) -> dict[str, str]:
+    """Upload-Metadata do tus: pares "chave valor_base64" separados por vírgula."""
+    metadata: dict[str, str] = {}
+    if not valor:
+        return metadata
+    for item in valor.split(","):
+        chave, _, codificado = item.strip().partition(" ")
+        try:
+            metadata[chave] = base64.b64decode(codificado.strip(), validate=True).decode("utf-8")
+        except (binascii.Error, UnicodeDecodeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Upload-Metadata inválido no campo '{chave}'.",
+            )
+    return metadata
+
+
+def _cabecalhos(sessao: UploadSessao) -> dict:
+    return {
+        "Tus-Resumable": TUS_VERSAO,
+        "Upload-Offset": str(sessao.recebido),
+        "Upload-Length": str(sessao.tamanho_total),
+        "Upload-Expires": format_datetime(
+            sessao.expira_em.replace(tzinfo=timezone.utc), usegmt=True
+        ),
+        "Cache-Control": "no-store",
+    }
+
+
+def _buscar_sessao(db: Session, id: str, travar: bool = False) -> UploadSessao:
+    query = db.query(UploadSessao).filter(UploadSessao.id == id)
+    if travar:
+        # relê os campos mesmo que a sessão já esteja no identity map
+        query = query.with_for_update().populate_existing()
+    sessao = query.first()
+
+    if sessao is None or (sessao.concluido_em is None and sessao.expira_em < datetime.utcnow()):
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Upload não encontrado ou expirado.")
+    return sessao
+
+
+def _ler_sessao(db: Session, id: str) -> UploadSessao:
+    """Lê a sessão desanexada, para o event loop consultar sem tocar no banco."""
+    sessao = _buscar_sessao(db, id)
+    db.expunge(sessao)
+    db.rollback()
+    return sessao
+
+
+def _reservar(db: Session, id: str, upload_offset: Optional[int] = None) -> tuple[str, UploadSessao]:
+    """
+    Reserva a sessão para uma chamada ao storage e retorna (token, sessão
+    desanexada). A linha fica travada só até o commit da reserva.
+    """
+    sessao = _buscar_sessao(db, id, travar=True)
+    agora = datetime.utcnow()
+    if sessao.concluido_em is not None:
+        detalhe = "Upload já concluído."
+    elif upload_offset is not None and sessao.recebido != upload_offset:
+        detalhe = "O upload avançou por outra requisição; consulte o offset."
+    elif sessao.reservada_ate is not None and sessao.reservada_ate > agora:
+        detalhe = "Outra requisição está enviando este upload; consulte o offset e tente de novo."
+    else:
+        token = secrets.token_hex(16)
+        sessao.reservada_por = token
+        sessao.reservada_ate = agora + timedelta(seconds=UPLOAD_RETOMAVEL_RESERVA_SECONDS)
+        # desanexada, não expira no commit: a chamada ao storage lê os
+        # campos sem abrir outra transação
+        db.flush()
+        db.expunge(sessao)
+        db.commit()
+        return token, sessao
+
+    db.rollback()
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detalhe)
+
+
+def _retomar(db: Session, id: str, token: str) -> UploadSessao:
+    """Trava de novo a sessão reservada com `token` e encerra a reserva (sem commit)."""
+    sessao = _buscar_sessao(db, id, travar=True)
+    if sessao.reservada_por != token:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A reserva do upload venceu durante a chamada ao storage; consulte o offset.",
+        )
+    sessao.reservada_por = None
+    sessao.reservada_ate = None
+    return sessao
+
+
+def _liberar(db: Session, id: str, token: str) -> None:
+    """Desfaz a reserva depois de uma falha no storage."""
+    db.query(UploadSessao).filter(
+        UploadSessao.id == id,
+        UploadSessao.reservada_por == token,
+    ).update({"reservada_por": None, "reservada_ate": None}, synchronize_session=False)
+    db.commit()
+
+
+@router.post(
+    "",
+    status_code=status.HTTP_201_CREATED,
+)
+async def criar_upload(
+    request: Request,
+    upload_length: Optional[int] = Header(None),
+    upload_metadata: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Cria a sessão de upload. Upload-Metadata leva `filename`, `meta` (o
+    mesmo JSON de /documents/upload) e, opcionalmente, `filetype`.
+    """
+    if upload_length is None or upload_length <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Informe Upload-Length (tamanho total do arquivo, maior que zero).",
+        )
+    if upload_length > UPLOAD_RETOMAVEL_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Arquivo maior que o limite de {UPLOAD_RETOMAVEL_MAX_BYTES} bytes.",
+        )
+
+    metadata = _ler_metadata(upload_metadata)
+    filename = metadata.get("filename")
+    if not filename:
+        raise HTTPException(status_code=400, detail="Arquivo sem nome.")
+
+    try:
+        meta_obj = DocumentoUploadMeta.model_validate_json(metadata.get("meta", ""))
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Erro ao validar meta: {e.errors()}",
+        )
+
+    agora = datetime.utcnow()
+    uuid12 = generate_uuid12()
+    ext = Path(filename).suffix.lower()
+    bucket_key = f"{meta_obj.cliente_id}/{agora:%Y-%m-%d}/{uuid12}{ext}"
+    content_type = metadata.get("filetype") or "application/octet-stream"
+
+    try:
+        multipart_id = await run_in_threadpool(storage.iniciar_multipart, bucket_key, content_type)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Falha ao iniciar o envio para o bucket: {e}",
+        )
+
+    sessao = UploadSessao(
+        id=secrets.token_hex(16),
+        uuid=uuid12,
+        cliente_id=meta_obj.cliente_id,
+        bucket_key=bucket_key,
+        filename=filename,
+        content_type=content_type,
+        tags=_TAGS.dump_python(meta_obj.tags),
+        tamanho_total=upload_length,
+        recebido=0,
+        multipart_id=multipart_id,
+        partes=[],
+        sha256_estado=Sha256Retomavel().estado(),
+        criado_em=agora,
+        expira_em=agora + timedelta(seconds=UPLOAD_RETOMAVEL_TTL_SECONDS),
+    )
+    headers = _cabecalhos(sessao)
+    headers["Location"] = f"{str(request.url).rstrip('/')}/{sessao.id}"
+    resposta = OrjsonResponse(
+        {
+            "id": sessao.id,
+            "uuid": sessao.uuid,
+            "parte_minima": _parte_minima(upload_length),
+            "parte_maxima": UPLOAD_RETOMAVEL_PARTE_MAX_BYTES,
+            "expira_em": sessao.expira_em,
+        },
+        status_code=status.HTTP_201_CREATED,
+        headers=headers,
+    )
+
+    db.add(sessao)
+    await run_in_threadpool(db.commit)
+    return resposta
+
+
+@router.head("/{id}")
+def consultar_upload(
+    id: str,
+    db: Session = Depends(get_db),
+) -> Response:
+    sessao = _buscar_sessao(db, id)
+    return Response(status_code=status.HTTP_200_OK, headers=_cabecalhos(sessao))
+
+
+def _gravar_bloco(pedaco, sha: Sha256Retomavel, bloco: bytes) -> None:
+    pedaco.write(bloco)
+    sha.update(bloco)
+
+
+async def _receber_pedaco(request: Request, limite: int, sha: Sha256Retomavel):
+    """
+    Grava o corpo do PATCH num temporário (em memória até
+    UPLOAD_RETOMAVEL_SPOOL_BYTES) e alimenta o SHA-256 na mesma passada.
+    A gravação e o hash rodam numa thread, em blocos de _BLOCO_BYTES, para
+    não parar o event loop (sem libcrypto o SHA-256 é Python puro).
+    """
+    pedaco = tempfile.SpooledTemporaryFile(max_size=UPLOAD_RETOMAVEL_SPOOL_BYTES)
+    tamanho = 0
+    bloco: list[bytes] = []
+    tamanho_bloco = 0
+    try:
+        async for chunk in request.stream():
+            tamanho += len(chunk)
+            if tamanho > limite:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Pedaço maior que o permitido ({limite} bytes).",
+                )
+            bloco.append(chunk)
+            tamanho_bloco += len(chunk)
+            if tamanho_bloco >= _BLOCO_BYTES:
+                await run_in_threadpool(_gravar_bloco, pedaco, sha, b"".join(bloco))
+                bloco, tamanho_bloco = [], 0
+        if bloco:
+            await run_in_threadpool(_gravar_bloco, pedaco, sha, b"".join(bloco))
+    except BaseException:
+        pedaco.close()
+        raise
+    pedaco.seek(0)
+    return pedaco, tamanho
+
+
+def _gravar_parte(
+    db: Session,
+    id: str,
+    upload_offset: int,
+    pedaco,
+    tamanho: int,
+    sha: Sha256Retomavel,
+) -> tuple[bool, dict]:
+    """
+    Grava o pedaço recebido como a próxima parte do multipart e avança a
+    sessão. Retorna (arquivo completo?, cabeçalhos da resposta).
+    """
+    # confere de novo: outro PATCH pode ter avançado o offset enquanto
+    # este corpo era recebido
+    token, sessao = _reservar(db, id, upload_offset)
+    numero = len(sessao.partes) + 1
+    try:
+        etag = storage.enviar_parte(sessao.bucket_key, sessao.multipart_id, numero, pedaco, tamanho)
+    except Exception as e:
+        _liberar(db, id, token)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Falha ao enviar parte para o bucket: {e}",
+        )
+
+    sessao = _retomar(db, id, token)
+    sessao.partes = [*sessao.partes, {"numero": numero, "etag": etag}]
+    sessao.recebido += tamanho
+    sessao.sha256_estado = sha.estado()
+    sessao.expira_em = datetime.utcnow() + timedelta(seconds=UPLOAD_RETOMAVEL_TTL_SECONDS)
+    resultado = sessao.recebido >= sessao.tamanho_total, _cabecalhos(sessao)
+    db.commit()
+    return resultado
+
+
+def _finalizar(db: Session, id: str) -> Response:
+    """
+    Monta o objeto a partir das partes e cria o Documento como no upload
+    direto. Se falhar, um PATCH vazio no offset final tenta de novo.
+    """
+    sessao = _ler_sessao(db, id)
+    if sessao.concluido_em is None:
+        token, sessao = _reservar(db, id)
+        partes = [(parte["numero"], parte["etag"]) for parte in sessao.partes]
+        try:
+            storage.concluir_multipart(sessao.bucket_key, sessao.multipart_id, partes)
+        except Exception as e:
+            # a conclusão pode ter dado certo numa tentativa anterior que
+            # falhou antes do commit
+            if storage.head(sessao.bucket_key) != sessao.tamanho_total:
+                _liberar(db, id, token)
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Falha ao concluir o envio para o bucket: {e}",
+                )
+
+        sessao = _retomar(db, id, token)
+        sha = Sha256Retomavel(sessao.sha256_estado)
+        documento = Documento(
+            uuid=sessao.uuid,
+            cliente_id=sessao.cliente_id,
+            bucket_key=sessao.bucket_key,
+            filename=sessao.filename,
+            content_type=sessao.content_type,
+            tamanho_bytes=sessao.tamanho_total,
+            hash_sha256=sha.hexdigest(),
+            tamanho_armazenado=sessao.tamanho_total,
+            criado_em=datetime.utcnow(),
+        )
+        registrar_documento(db, documento, _TAGS.validate_python(sessao.tags))
+        sessao.concluido_em = documento.criado_em
+        db.commit()
+
+    return _resposta_concluido(db, sessao)
+
+
+def _resposta_concluido(db: Session, sessao: UploadSessao) -> Response:
+    documento = db.query(Documento).filter(Documento.uuid == sessao.uuid).first()
+    if documento is None:
+        raise HTTPException(status_code=404, detail="Documento não encontrado.")
+    return OrjsonResponse(
+        DocumentoOut.model_validate(documento).model_dump(),
+        headers=_cabecalhos(sessao),
+    )
+
+
+def _conferir_offset(db: Session, id: str, upload_offset: int) -> tuple[bool, dict]:
+    """PATCH vazio: confere o offset sem gravar nada."""
+    sessao = _ler_sessao(db, id)
+    if sessao.concluido_em is None and sessao.recebido != upload_offset:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="O upload avançou por outra requisição; consulte o offset.",
+        )
+    return sessao.recebido >= sessao.tamanho_total, _cabecalhos(sessao)
+
+
+async def _enviar_parte(
+    db: Session,
+    id: str,
+    request: Request,
+    upload_offset: int,
+    limite: int,
+    parte_minima: int,
+    restante: int,
+    sha: Sha256Retomavel,
+) -> tuple[bool, dict]:
+    """Recebe o corpo do PATCH e o grava como a próxima parte do multipart."""
+    pedaco, tamanho = await _receber_pedaco(request, limite, sha)
+    try:
+        if 0 < tamanho < min(parte_minima, restante):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Pedaço menor que o mínimo de {parte_minima} bytes (exceto o último).",
+            )
+        if tamanho == 0:
+            return await run_in_threadpool(_conferir_offset, db, id, upload_offset)
+        return await run_in_threadpool(_gravar_parte, db, id, upload_offset, pedaco, tamanho, sha)
+    finally:
+        pedaco.close()
+
+
+@router.patch("/{id}")
+async def enviar_pedaco(
+    id: str,
+    request: Request,
+    upload_offset: Optional[int] = Header(None),
+    content_length: Optional[int] = Header(None),
+    db: Session = Depends(get_db),
+) -> Response:
+    if upload_offset is None:
+        raise HTTPException(status_code=400, detail="Informe Upload-Offset.")
+
+    sessao = await run_in_threadpool(_ler_sessao, db, id)
+    if sessao.concluido_em is not None:
+        if upload_offset == sessao.tamanho_total:
+            return await run_in_threadpool(_resposta_concluido, db, sessao)
+        raise HTTPException(status_code=409, detail="Upload já concluído.")
+    if upload_offset != sessao.recebido:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload-Offset divergente; o servidor tem {sessao.recebido} bytes.",
+            headers=_cabecalhos(sessao),
+        )
+
+    restante = sessao.tamanho_total - sessao.recebido
+    sha = Sha256Retomavel(sessao.sha256_estado)
+    parte_minima = _parte_minima(sessao.tamanho_total)
+    cliente_id = sessao.cliente_id
+
+    # Reserva no orçamento de uploads em andamento o tamanho do pedaço (ou
+    # o máximo permitido, sem Content-Length) até a parte chegar ao storage.
+    limite = min(restante, UPLOAD_RETOMAVEL_PARTE_MAX_BYTES)
+    reserva = min(content_length, limite) if content_length is not None else limite
+    motivo = await admissao_uploads.adquirir(cliente_id, reserva, UPLOAD_QUEUE_TIMEOUT_SECONDS)
+    if motivo is not None:
+        status_code, detalhe, headers = recusa_upload(motivo)
+        headers["Tus-Resumable"] = TUS_VERSAO
+        raise HTTPException(status_code=status_code, detail=detalhe, headers=headers)
+
+    try:
+        completo, headers = await _enviar_parte(
+            db, id, request, upload_offset, limite, parte_minima, restante, sha
+        )
+    finally:
+        admissao_uploads.liberar(cliente_id, reserva)
+
+    if not completo:
+        return Response(status_code=status.HTTP_204_NO_CONTENT, headers=headers)
+    return await run_in_threadpool(_finalizar, db, id)
+
+
+def _cancelar(db: Session, id: str) -> None:
+    token, sessao = _reservar(db, id)
+    try:
+        storage.abortar_multipart(sessao.bucket_key, sessao.multipart_id)
+    except Exception as e:
+        _liberar(db, id, token)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Falha ao abortar o envio no bucket: {e}",
+        )
+
+    db.delete(_retomar(db, id, token))
+    db.commit()
+
+
+@router.delete(
+    "/{id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def cancelar_upload(
+    id: str,
+    db: Session = Depends(get_db),
+) -> Response:
+    await run_in_threadpool(_cancelar, db, id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers={"Tus-Resumable": TUS_VERSAO})
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class TagBase(BaseModel):
@@ -43,4 +43,71 @@ class DocumentoUploadMeta(BaseModel):
 
 class DocumentoUpdate(BaseModel):
     filename: Optional[str] = None
-    tags: Optional[List[TagCreate]] = None
\ No newline at end of file
+    tags: Optional[List[TagCreate]] = None
+
+
+class DocumentoFiltro(BaseModel):
+    cliente_id: Optional[int] = None
+    tag_chave: Optional[str] = None
+    tag_valor: Optional[str] = None
+    q: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _exige_criterio(self):
+        if all(v is None for v in self.model_dump().values()):
+            raise ValueError("Informe ao menos um critério no filtro.")
+        return self
+
+
+class DocumentoSelecao(BaseModel):
+    """Seleciona documentos por lista de uuids ou pelos filtros da busca."""
+
+    uuids: Optional[List[str]] = None
+    filtro: Optional[DocumentoFiltro] = None
+
+    @model_validator(mode="after")
+    def _exige_uuids_ou_filtro(self):
+        if (self.uuids is None) == (self.filtro is None):
+            raise ValueError("Informe 'uuids' ou 'filtro' (apenas um deles).")
+        return self
+
+
+class TagOperacao(BaseModel):
+    op: Literal["add", "remove", "replace"]
+    chave: str = Field(..., min_length=1, max_length=100)
+    valor: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _exige_valor(self):
+        if self.op != "remove" and self.valor is None:
+            raise ValueError(f"A operação '{self.op}' exige 'valor'.")
+        return self
+
+
+class TagsBulkIn(DocumentoSelecao):
+    operacoes: List[TagOperacao] = Field(..., min_length=1)
+
+
+class TagsBulkOut(BaseModel):
+    documentos: int
+    inseridas: int
+    removidas: int
+
+
+class DocumentosBulkDeleteOut(BaseModel):
+    removidos: int
+    eventos: List[int] = []
+
+
+class EstatisticaTipoOut(BaseModel):
+    content_type: str
+    total_documentos: int
+    total_bytes: int
+
+
+class EstatisticasClienteOut(BaseModel):
+    cliente_id: int
+    total_documentos: int
+    total_bytes: int
+    ultimo_upload_em: Optional[datetime] = None
+    por_content_type: List[EstatisticaTipoOut] = []
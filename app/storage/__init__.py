@@ -0,0 +1,53 @@
+import os
+from functools import lru_cache
+
+from app.storage.base import (
+    MULTIPART_MAX_PARTES,
+    MULTIPART_PARTE_MINIMA,
+    ObjetoArmazenado,
+    ObjetoListado,
+    StorageBackend,
+)
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3").lower()
+
+
+@lru_cache(maxsize=None)
+def get_storage() -> StorageBackend:
+    """
+    Backend de armazenamento configurado em STORAGE_BACKEND:
+    "s3" (padrão, usa S3_BUCKET_NAME), "local" (STORAGE_LOCAL_DIR) ou
+    "memory" (testes e benchmarks). A instância é única por processo.
+    """
+    if STORAGE_BACKEND == "s3":
+        from app.storage.s3 import S3Storage
+
+        bucket = os.getenv("S3_BUCKET_NAME", "")
+        if not bucket:
+            raise RuntimeError("S3_BUCKET_NAME não configurado no .env")
+        return S3Storage(bucket)
+
+    if STORAGE_BACKEND == "local":
+        from app.storage.local import LocalStorage
+
+        raiz = os.getenv("STORAGE_LOCAL_DIR", "")
+        if not raiz:
+            raise RuntimeError("STORAGE_LOCAL_DIR não configurado no .env")
+        return LocalStorage(raiz)
+
+    if STORAGE_BACKEND == "memory":
+        from app.storage.memory import MemoryStorage
+
+        return MemoryStorage()
+
+    raise RuntimeError(f"STORAGE_BACKEND inválido: {STORAGE_BACKEND}")
+
+
+__all__ = [
+    "MULTIPART_MAX_PARTES",
+    "MULTIPART_PARTE_MINIMA",
+    "ObjetoArmazenado",
+    "ObjetoListado",
+    "StorageBackend",
+    "get_storage",
+]
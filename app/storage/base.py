@@ -0,0 +1,119 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+# limites do multipart do S3, seguidos por todos os backends
+MULTIPART_PARTE_MINIMA = 5 * 1024 * 1024
+MULTIPART_MAX_PARTES = 10000
+
+
+@dataclass
+class ObjetoArmazenado:
+    """Objeto aberto para leitura; `stream` expõe read(n) e close()."""
+
+    stream: BinaryIO
+    tamanho: int
+    content_type: Optional[str] = None
+
+
+@dataclass
+class ObjetoListado:
+    key: str
+    tamanho: int
+    modificado_em: datetime
+
+
+class StorageBackend(ABC):
+    """
+    Interface de armazenamento dos arquivos dos documentos. As rotas e os
+    jobs falam só com ela; a implementação é escolhida por STORAGE_BACKEND.
+    """
+
+    @abstractmethod
+    def put_stream(self, key: str, fileobj: BinaryIO, content_type: str) -> None:
+        """Grava o conteúdo lido de `fileobj` até o fim, sem carregá-lo inteiro."""
+
+    @abstractmethod
+    def get(
+        self,
+        key: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ) -> ObjetoArmazenado:
+        """Abre o objeto, opcionalmente só o intervalo [start, end] (inclusivo)."""
+
+    @abstractmethod
+    def head(self, key: str) -> Optional[int]:
+        """Tamanho do objeto em bytes, ou None se ele não existir."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Apaga o objeto; apagar um objeto inexistente não é erro."""
+
+    @abstractmethod
+    def delete_many(self, keys: Iterable[str]) -> dict[str, str]:
+        """Apaga vários objetos e retorna {key: erro} dos que falharam."""
+
+    @abstractmethod
+    def copy(self, origem: str, destino: str) -> None:
+        """Copia um objeto dentro do mesmo armazenamento."""
+
+    @abstractmethod
+    def listar(self, prefixo: str = "") -> Iterator[ObjetoListado]:
+        """Percorre os objetos cujo key começa com `prefixo`."""
+
+    @abstractmethod
+    def iniciar_multipart(self, key: str, content_type: str) -> str:
+        """Inicia um envio em partes do objeto `key` e retorna o id do envio."""
+
+    @abstractmethod
+    def enviar_parte(
+        self,
+        key: str,
+        upload_id: str,
+        numero: int,
+        fileobj: BinaryIO,
+        tamanho: int,
+    ) -> str:
+        """
+        Grava a parte `numero` (a partir de 1) com `tamanho` bytes lidos de
+        `fileobj` e retorna o identificador (ETag) exigido para concluir.
+        Todas as partes menos a última precisam de MULTIPART_PARTE_MINIMA bytes.
+        """
+
+    @abstractmethod
+    def concluir_multipart(
+        self,
+        key: str,
+        upload_id: str,
+        partes: list[tuple[int, str]],
+    ) -> None:
+        """Monta o objeto a partir das partes [(numero, etag), ...], em ordem."""
+
+    @abstractmethod
+    def abortar_multipart(self, key: str, upload_id: str) -> None:
+        """Descarta as partes de um envio; abortar um envio inexistente não é erro."""
+
+    def presign(
+        self,
+        key: str,
+        expira_em_segundos: int,
+        filename: Optional[str] = None,
+        content_encoding: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        URL temporária de download direto, ou None se não suportado.
+        `content_encoding` é devolvido como Content-Encoding da resposta
+        (objetos gravados comprimidos).
+        """
+        return None
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """
+        Caminho do arquivo em disco quando o backend é local, para que o
+        download seja servido pelo servidor (FileResponse) sem passar os
+        bytes por Python. None nos demais backends.
+        """
+        return None
@@ -0,0 +1,187 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+from app.storage.base import ObjetoArmazenado
+
+DOWNLOAD_CACHE_DIR = os.getenv("DOWNLOAD_CACHE_DIR", "")
+DOWNLOAD_CACHE_MAX_BYTES = int(os.getenv("DOWNLOAD_CACHE_MAX_BYTES", str(10 * 1024**3)))
+DOWNLOAD_CACHE_MAX_OBJECT_BYTES = int(
+    os.getenv("DOWNLOAD_CACHE_MAX_OBJECT_BYTES", str(64 * 1024**2))
+)
+DOWNLOAD_CACHE_WAIT_SECONDS = float(os.getenv("DOWNLOAD_CACHE_WAIT_SECONDS", "30"))
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class DiskCache:
+    """
+    Cache read-through em disco local para downloads frequentes.
+
+    Cada entrada é identificada por bucket_key + hash_sha256, então um
+    conteúdo novo nunca é confundido com um antigo. O arquivo se chama
+    "<sha256(bucket_key)>-<hash>", o que permite invalidar por bucket_key
+    e reconstruir o índice a partir do diretório ao reiniciar.
+
+    A ocupação é limitada a `max_bytes`, com despejo LRU. Faltas
+    simultâneas para o mesmo objeto são unificadas: só a primeira busca
+    no storage, as demais esperam e leem do disco.
+    """
+
+    def __init__(self, diretorio: str, max_bytes: int, max_objeto_bytes: int):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_objeto_bytes = max_objeto_bytes
+
+        self._lru: OrderedDict[str, int] = OrderedDict()
+        self._usado = 0
+        self._em_voo: dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.despejos = 0
+        self.invalidacoes = 0
+        self.erros = 0
+
+        self._carregar_existentes()
+
+    @staticmethod
+    def _prefixo(bucket_key: str) -> str:
+        return hashlib.sha256(bucket_key.encode("utf-8")).hexdigest()
+
+    def _nome(self, bucket_key: str, hash_sha256: Optional[str]) -> str:
+        return f"{self._prefixo(bucket_key)}-{hash_sha256 or 'vazio'}"
+
+    def _carregar_existentes(self) -> None:
+        arquivos = []
+        for caminho in self.diretorio.iterdir():
+            if caminho.name.startswith(".tmp-"):
+                caminho.unlink(missing_ok=True)
+                continue
+            st = caminho.stat()
+            arquivos.append((st.st_atime, caminho.name, st.st_size))
+
+        for _, nome, tamanho in sorted(arquivos):
+            self._lru[nome] = tamanho
+            self._usado += tamanho
+        self._despejar()
+
+    def _despejar(self) -> None:
+        # chamado com self._lock adquirido (ou na inicialização)
+        while self._usado > self.max_bytes and self._lru:
+            nome, tamanho = self._lru.popitem(last=False)
+            self._usado -= tamanho
+            self.despejos += 1
+            # leitores com o arquivo aberto continuam lendo após o unlink
+            (self.diretorio / nome).unlink(missing_ok=True)
+
+    def _abrir(self, nome: str) -> Optional[ObjetoArmazenado]:
+        with self._lock:
+            if nome not in self._lru:
+                return None
+            try:
+                arquivo = open(self.diretorio / nome, "rb")
+            except FileNotFoundError:
+                self._usado -= self._lru.pop(nome)
+                return None
+            self._lru.move_to_end(nome)
+            return ObjetoArmazenado(stream=arquivo, tamanho=self._lru[nome])
+
+    def _preencher(self, nome: str, buscar: Callable[[], ObjetoArmazenado]) -> None:
+        obj = buscar()
+        fd, tmp = tempfile.mkstemp(dir=self.diretorio, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                try:
+                    shutil.copyfileobj(obj.stream, out, COPY_BUFFER_SIZE)
+                finally:
+                    obj.stream.close()
+            tamanho = os.path.getsize(tmp)
+            os.replace(tmp, self.diretorio / nome)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+        with self._lock:
+            self._lru[nome] = tamanho
+            self._usado += tamanho
+            self._despejar()
+
+    def obter(
+        self,
+        bucket_key: str,
+        hash_sha256: Optional[str],
+        buscar: Callable[[], ObjetoArmazenado],
+    ) -> Optional[ObjetoArmazenado]:
+        """
+        Abre o objeto a partir do cache, buscando-o com `buscar` em caso de
+        falta. Retorna None se não foi possível servir pelo cache (falha na
+        busca ou espera esgotada); o chamador então lê direto do storage.
+        """
+        nome = self._nome(bucket_key, hash_sha256)
+
+        obj = self._abrir(nome)
+        if obj is not None:
+            with self._lock:
+                self.hits += 1
+            return obj
+
+        with self._lock:
+            self.misses += 1
+            evento = self._em_voo.get(nome)
+            lider = evento is None
+            if lider:
+                evento = self._em_voo[nome] = threading.Event()
+
+        if not lider:
+            evento.wait(DOWNLOAD_CACHE_WAIT_SECONDS)
+            return self._abrir(nome)
+
+        try:
+            self._preencher(nome, buscar)
+        except Exception:
+            with self._lock:
+                self.erros += 1
+            return None
+        finally:
+            with self._lock:
+                del self._em_voo[nome]
+            evento.set()
+
+        return self._abrir(nome)
+
+    def invalidar(self, bucket_key: str) -> None:
+        """Remove todas as versões em cache do objeto `bucket_key`."""
+        prefixo = self._prefixo(bucket_key) + "-"
+        with self._lock:
+            for nome in [n for n in self._lru if n.startswith(prefixo)]:
+                self._usado -= self._lru.pop(nome)
+                (self.diretorio / nome).unlink(missing_ok=True)
+                self.invalidacoes += 1
+
+    def metricas(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "despejos": self.despejos,
+                "invalidacoes": self.invalidacoes,
+                "erros": self.erros,
+                "objetos": len(self._lru),
+                "bytes_usados": self._usado,
+                "bytes_maximo": self.max_bytes,
+            }
+
+
+download_cache: Optional[DiskCache] = (
+    DiskCache(DOWNLOAD_CACHE_DIR, DOWNLOAD_CACHE_MAX_BYTES, DOWNLOAD_CACHE_MAX_OBJECT_BYTES)
+    if DOWNLOAD_CACHE_DIR
+    else None
+)
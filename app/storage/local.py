@@ -0,0 +1,166 @@
+import os
+import secrets
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from app.storage.base import ObjetoArmazenado, ObjetoListado, StorageBackend
+from app.utils.streams import LeitorLimitado
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# partes dos envios em andamento ficam em <raiz>/.multipart/<upload_id>/
+MULTIPART_DIR = ".multipart"
+
+
+class LocalStorage(StorageBackend):
+    """
+    Armazena os objetos como arquivos sob `raiz`, usando o bucket_key como
+    caminho relativo. Pensado para instalações on-prem sem S3.
+    """
+
+    def __init__(self, raiz: str):
+        self.raiz = Path(raiz).resolve()
+        self.raiz.mkdir(parents=True, exist_ok=True)
+
+    def _caminho(self, key: str) -> Path:
+        caminho = (self.raiz / key).resolve()
+        if not caminho.is_relative_to(self.raiz):
+            raise ValueError(f"Chave fora do diretório de armazenamento: {key}")
+        return caminho
+
+    def put_stream(self, key: str, fileobj: BinaryIO, content_type: str) -> None:
+        destino = self._caminho(key)
+        destino.parent.mkdir(parents=True, exist_ok=True)
+
+        # grava num temporário no mesmo diretório e troca atomicamente, para
+        # que um leitor nunca veja o arquivo pela metade
+        fd, tmp = tempfile.mkstemp(dir=destino.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                shutil.copyfileobj(fileobj, out, COPY_BUFFER_SIZE)
+            os.replace(tmp, destino)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def get(
+        self,
+        key: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ) -> ObjetoArmazenado:
+        caminho = self._caminho(key)
+        tamanho = caminho.stat().st_size
+        arquivo = open(caminho, "rb")
+
+        if start is None and end is None:
+            return ObjetoArmazenado(stream=arquivo, tamanho=tamanho)
+
+        inicio = start or 0
+        fim = tamanho - 1 if end is None else min(end, tamanho - 1)
+        arquivo.seek(inicio)
+        parcial = max(fim - inicio + 1, 0)
+        return ObjetoArmazenado(stream=LeitorLimitado(arquivo, parcial), tamanho=parcial)
+
+    def head(self, key: str) -> Optional[int]:
+        try:
+            return self._caminho(key).stat().st_size
+        except FileNotFoundError:
+            return None
+
+    def delete(self, key: str) -> None:
+        self._caminho(key).unlink(missing_ok=True)
+
+    def delete_many(self, keys: Iterable[str]) -> dict[str, str]:
+        erros: dict[str, str] = {}
+        for key in keys:
+            try:
+                self.delete(key)
+            except Exception as e:
+                erros[key] = str(e)
+        return erros
+
+    def copy(self, origem: str, destino: str) -> None:
+        with open(self._caminho(origem), "rb") as src:
+            self.put_stream(destino, src, "application/octet-stream")
+
+    def listar(self, prefixo: str = "") -> Iterator[ObjetoListado]:
+        for dirpath, diretorios, arquivos in os.walk(self.raiz):
+            if Path(dirpath) == self.raiz and MULTIPART_DIR in diretorios:
+                diretorios.remove(MULTIPART_DIR)
+            for nome in arquivos:
+                if nome.startswith(".tmp-"):
+                    continue
+                caminho = Path(dirpath) / nome
+                key = caminho.relative_to(self.raiz).as_posix()
+                if not key.startswith(prefixo):
+                    continue
+                st = caminho.stat()
+                yield ObjetoListado(
+                    key=key,
+                    tamanho=st.st_size,
+                    modificado_em=datetime.fromtimestamp(st.st_mtime, tz=timezone.utc),
+                )
+
+    def _dir_multipart(self, upload_id: str) -> Path:
+        if not upload_id.isalnum():
+            raise ValueError(f"Id de envio inválido: {upload_id}")
+        return self.raiz / MULTIPART_DIR / upload_id
+
+    def iniciar_multipart(self, key: str, content_type: str) -> str:
+        upload_id = secrets.token_hex(16)
+        self._dir_multipart(upload_id).mkdir(parents=True)
+        return upload_id
+
+    def enviar_parte(
+        self,
+        key: str,
+        upload_id: str,
+        numero: int,
+        fileobj: BinaryIO,
+        tamanho: int,
+    ) -> str:
+        diretorio = self._dir_multipart(upload_id)
+        if not diretorio.is_dir():
+            raise FileNotFoundError(f"Envio em partes inexistente: {upload_id}")
+
+        fd, tmp = tempfile.mkstemp(dir=diretorio, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                shutil.copyfileobj(LeitorLimitado(fileobj, tamanho), out, COPY_BUFFER_SIZE)
+            os.replace(tmp, diretorio / f"{numero:05d}")
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return str(numero)
+
+    def concluir_multipart(
+        self,
+        key: str,
+        upload_id: str,
+        partes: list[tuple[int, str]],
+    ) -> None:
+        diretorio = self._dir_multipart(upload_id)
+        destino = self._caminho(key)
+        destino.parent.mkdir(parents=True, exist_ok=True)
+
+        fd, tmp = tempfile.mkstemp(dir=destino.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for numero, _ in partes:
+                    with open(diretorio / f"{numero:05d}", "rb") as parte:
+                        shutil.copyfileobj(parte, out, COPY_BUFFER_SIZE)
+            os.replace(tmp, destino)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    def abortar_multipart(self, key: str, upload_id: str) -> None:
+        shutil.rmtree(self._dir_multipart(upload_id), ignore_errors=True)
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return self._caminho(key)
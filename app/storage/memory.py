@@ -0,0 +1,102 @@
+import io
+import secrets
+import threading
+from datetime import datetime, timezone
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from app.storage.base import ObjetoArmazenado, ObjetoListado, StorageBackend
+
+
+class MemoryStorage(StorageBackend):
+    """Armazenamento em memória do processo, para testes e benchmarks."""
+
+    def __init__(self):
+        self._objetos: dict[str, tuple[bytes, str, datetime]] = {}
+        self._multipart: dict[str, tuple[str, dict[int, bytes]]] = {}
+        self._lock = threading.Lock()
+
+    def put_stream(self, key: str, fileobj: BinaryIO, content_type: str) -> None:
+        dados = fileobj.read()
+        with self._lock:
+            self._objetos[key] = (dados, content_type, datetime.now(timezone.utc))
+
+    def get(
+        self,
+        key: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ) -> ObjetoArmazenado:
+        with self._lock:
+            if key not in self._objetos:
+                raise KeyError(key)
+            dados, content_type, _ = self._objetos[key]
+
+        if start is not None or end is not None:
+            dados = dados[start or 0:None if end is None else end + 1]
+
+        return ObjetoArmazenado(
+            stream=io.BytesIO(dados),
+            tamanho=len(dados),
+            content_type=content_type,
+        )
+
+    def head(self, key: str) -> Optional[int]:
+        with self._lock:
+            obj = self._objetos.get(key)
+        return len(obj[0]) if obj else None
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._objetos.pop(key, None)
+
+    def delete_many(self, keys: Iterable[str]) -> dict[str, str]:
+        with self._lock:
+            for key in keys:
+                self._objetos.pop(key, None)
+        return {}
+
+    def copy(self, origem: str, destino: str) -> None:
+        with self._lock:
+            self._objetos[destino] = self._objetos[origem]
+
+    def listar(self, prefixo: str = "") -> Iterator[ObjetoListado]:
+        with self._lock:
+            itens = [
+                (key, obj) for key, obj in self._objetos.items() if key.startswith(prefixo)
+            ]
+        for key, (dados, _, modificado_em) in itens:
+            yield ObjetoListado(key=key, tamanho=len(dados), modificado_em=modificado_em)
+
+    def iniciar_multipart(self, key: str, content_type: str) -> str:
+        upload_id = secrets.token_hex(16)
+        with self._lock:
+            self._multipart[upload_id] = (content_type, {})
+        return upload_id
+
+    def enviar_parte(
+        self,
+        key: str,
+        upload_id: str,
+        numero: int,
+        fileobj: BinaryIO,
+        tamanho: int,
+    ) -> str:
+        dados = fileobj.read(tamanho)
+        with self._lock:
+            self._multipart[upload_id][1][numero] = dados
+        return str(numero)
+
+    def concluir_multipart(
+        self,
+        key: str,
+        upload_id: str,
+        partes: list[tuple[int, str]],
+    ) -> None:
+        with self._lock:
+            content_type, recebidas = self._multipart.pop(upload_id)
+            dados = b"".join(recebidas[numero] for numero, _ in partes)
+            self._objetos[key] = (dados, content_type, datetime.now(timezone.utc))
+
+    def abortar_multipart(self, key: str, upload_id: str) -> None:
+        with self._lock:
+            self._multipart.pop(upload_id, None)
@@ -0,0 +1,157 @@
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+import boto3
+from botocore.exceptions import ClientError
+
+from app.storage.base import ObjetoArmazenado, ObjetoListado, StorageBackend
+
+# delete_objects aceita no máximo 1000 chaves por chamada
+S3_DELETE_MAX_KEYS = 1000
+
+
+class S3Storage(StorageBackend):
+    def __init__(self, bucket: str, client=None):
+        self.bucket = bucket
+        self.client = client or boto3.client("s3")
+
+    def put_stream(self, key: str, fileobj: BinaryIO, content_type: str) -> None:
+        # upload_fileobj faz multipart automaticamente para arquivos grandes
+        self.client.upload_fileobj(
+            fileobj,
+            self.bucket,
+            key,
+            ExtraArgs={"ContentType": content_type},
+        )
+
+    def get(
+        self,
+        key: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ) -> ObjetoArmazenado:
+        params = {"Bucket": self.bucket, "Key": key}
+        if start is not None or end is not None:
+            params["Range"] = f"bytes={start or 0}-{'' if end is None else end}"
+
+        obj = self.client.get_object(**params)
+        return ObjetoArmazenado(
+            stream=obj["Body"],
+            tamanho=obj["ContentLength"],
+            content_type=obj.get("ContentType"),
+        )
+
+    def head(self, key: str) -> Optional[int]:
+        try:
+            obj = self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return obj["ContentLength"]
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def delete_many(self, keys: Iterable[str]) -> dict[str, str]:
+        keys = list(keys)
+        erros: dict[str, str] = {}
+
+        for i in range(0, len(keys), S3_DELETE_MAX_KEYS):
+            lote = keys[i:i + S3_DELETE_MAX_KEYS]
+            try:
+                resp = self.client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={"Objects": [{"Key": key} for key in lote], "Quiet": True},
+                )
+            except Exception as e:
+                erros.update({key: str(e) for key in lote})
+                continue
+
+            for erro in resp.get("Errors", []):
+                erros[erro["Key"]] = f"{erro.get('Code', '')}: {erro.get('Message', '')}"
+
+        return erros
+
+    def copy(self, origem: str, destino: str) -> None:
+        self.client.copy_object(
+            Bucket=self.bucket,
+            Key=destino,
+            CopySource={"Bucket": self.bucket, "Key": origem},
+        )
+
+    def listar(self, prefixo: str = "") -> Iterator[ObjetoListado]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for pagina in paginator.paginate(Bucket=self.bucket, Prefix=prefixo):
+            for obj in pagina.get("Contents", []):
+                yield ObjetoListado(
+                    key=obj["Key"],
+                    tamanho=obj["Size"],
+                    modificado_em=obj["LastModified"],
+                )
+
+    def iniciar_multipart(self, key: str, content_type: str) -> str:
+        resp = self.client.create_multipart_upload(
+            Bucket=self.bucket,
+            Key=key,
+            ContentType=content_type,
+        )
+        return resp["UploadId"]
+
+    def enviar_parte(
+        self,
+        key: str,
+        upload_id: str,
+        numero: int,
+        fileobj: BinaryIO,
+        tamanho: int,
+    ) -> str:
+        resp = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=numero,
+            Body=fileobj,
+            ContentLength=tamanho,
+        )
+        return resp["ETag"]
+
+    def concluir_multipart(
+        self,
+        key: str,
+        upload_id: str,
+        partes: list[tuple[int, str]],
+    ) -> None:
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={
+                "Parts": [{"PartNumber": numero, "ETag": etag} for numero, etag in partes]
+            },
+        )
+
+    def abortar_multipart(self, key: str, upload_id: str) -> None:
+        try:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "NoSuchUpload":
+                raise
+
+    def presign(
+        self,
+        key: str,
+        expira_em_segundos: int,
+        filename: Optional[str] = None,
+        content_encoding: Optional[str] = None,
+    ) -> Optional[str]:
+        params = {"Bucket": self.bucket, "Key": key}
+        if filename:
+            params["ResponseContentDisposition"] = f'attachment; filename="{filename}"'
+        if content_encoding:
+            params["ResponseContentEncoding"] = content_encoding
+
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params=params,
+            ExpiresIn=expira_em_segundos,
+        )
@@ -0,0 +1,176 @@
+import os
+import zlib
+from typing import BinaryIO, Optional
+
+from app.storage import ObjetoArmazenado
+
+# Algoritmo usado nos uploads: "zstd", "gzip" ou vazio (desligado).
+UPLOAD_COMPRESSAO = os.getenv("UPLOAD_COMPRESSAO", "").lower()
+UPLOAD_COMPRESSAO_NIVEL = int(os.getenv("UPLOAD_COMPRESSAO_NIVEL", "0"))
+# Só comprime se a amostra encolher para no máximo esta fração do original.
+UPLOAD_COMPRESSAO_RAZAO_MAXIMA = float(os.getenv("UPLOAD_COMPRESSAO_RAZAO_MAXIMA", "0.8"))
+UPLOAD_COMPRESSAO_AMOSTRA_BYTES = int(os.getenv("UPLOAD_COMPRESSAO_AMOSTRA_BYTES", str(256 * 1024)))
+UPLOAD_COMPRESSAO_MIN_BYTES = int(os.getenv("UPLOAD_COMPRESSAO_MIN_BYTES", "4096"))
+
+ALGORITMOS = ("zstd", "gzip")
+
+# Tipos candidatos; a decisão final é da razão medida na amostra (um PDF
+# exportado sem compressão interna encolhe bem, um PDF comum não).
+TIPOS_COMPRIMIVEIS = (
+    "text/",
+    "application/xml",
+    "application/json",
+    "application/x-ndjson",
+    "application/csv",
+    "application/javascript",
+    "application/pdf",
+    "application/postscript",
+    "application/rtf",
+    "image/tiff",
+    "image/bmp",
+    "image/svg+xml",
+)
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("Compressão zstd requer o pacote zstandard instalado")
+    return zstandard
+
+
+def _compressor(algoritmo: str):
+    if algoritmo == "zstd":
+        nivel = UPLOAD_COMPRESSAO_NIVEL or 3
+        return _zstandard().ZstdCompressor(level=nivel).compressobj()
+    if algoritmo == "gzip":
+        nivel = UPLOAD_COMPRESSAO_NIVEL or 6
+        return zlib.compressobj(nivel, zlib.DEFLATED, 31)
+    raise ValueError(f"Algoritmo de compressão inválido: {algoritmo}")
+
+
+def _descompressor(algoritmo: str):
+    if algoritmo == "zstd":
+        return _zstandard().ZstdDecompressor().decompressobj()
+    if algoritmo == "gzip":
+        return zlib.decompressobj(31)
+    raise ValueError(f"Algoritmo de compressão inválido: {algoritmo}")
+
+
+def escolher_compressao(fileobj: BinaryIO, content_type: str) -> Optional[str]:
+    """
+    Decide se o upload deve ser comprimido: o tipo precisa ser candidato e
+    uma amostra do início do arquivo precisa encolher o suficiente. O
+    arquivo volta para a posição 0.
+    """
+    if UPLOAD_COMPRESSAO not in ALGORITMOS:
+        return None
+    if not content_type.lower().startswith(TIPOS_COMPRIMIVEIS):
+        return None
+
+    amostra = fileobj.read(UPLOAD_COMPRESSAO_AMOSTRA_BYTES)
+    fileobj.seek(0)
+    if len(amostra) < UPLOAD_COMPRESSAO_MIN_BYTES:
+        return None
+
+    compressor = _compressor(UPLOAD_COMPRESSAO)
+    comprimido = len(compressor.compress(amostra)) + len(compressor.flush())
+    if comprimido > len(amostra) * UPLOAD_COMPRESSAO_RAZAO_MAXIMA:
+        return None
+    return UPLOAD_COMPRESSAO
+
+
+class LeitorComprimido:
+    """
+    Lê de `fonte` e entrega os bytes já comprimidos, em streaming.
+    `tamanho` acumula quantos bytes comprimidos foram entregues.
+    """
+
+    def __init__(self, fonte: BinaryIO, algoritmo: str):
+        self._fonte = fonte
+        self._compressor = _compressor(algoritmo)
+        self._buffer = bytearray()
+        self._fim = False
+        self.tamanho = 0
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._fim and (size is None or size < 0 or len(self._buffer) < size):
+            chunk = self._fonte.read(STREAM_CHUNK_SIZE)
+            if chunk:
+                self._buffer += self._compressor.compress(chunk)
+            else:
+                self._buffer += self._compressor.flush()
+                self._fim = True
+
+        if size is None or size < 0 or size >= len(self._buffer):
+            dados = bytes(self._buffer)
+            self._buffer.clear()
+        else:
+            dados = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        self.tamanho += len(dados)
+        return dados
+
+
+class LeitorDescomprimido:
+    """Envolve o stream de um objeto comprimido e entrega o conteúdo original."""
+
+    def __init__(self, stream: BinaryIO, algoritmo: str):
+        self._stream = stream
+        self._descompressor = _descompressor(algoritmo)
+        self._buffer = bytearray()
+        self._fim = False
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._fim and (size is None or size < 0 or len(self._buffer) < size):
+            chunk = self._stream.read(STREAM_CHUNK_SIZE)
+            if chunk:
+                self._buffer += self._descompressor.decompress(chunk)
+            else:
+                self._fim = True
+
+        if size is None or size < 0 or size >= len(self._buffer):
+            dados = bytes(self._buffer)
+            self._buffer.clear()
+        else:
+            dados = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        return dados
+
+    def close(self) -> None:
+        self._stream.close()
+
+
+def descomprimir(obj: ObjetoArmazenado, algoritmo: Optional[str], tamanho: int) -> ObjetoArmazenado:
+    """
+    Objeto com o conteúdo original de `obj`; `tamanho` é o tamanho
+    original (Documento.tamanho_bytes). Sem algoritmo, devolve `obj`.
+    """
+    if not algoritmo:
+        return obj
+    return ObjetoArmazenado(
+        stream=LeitorDescomprimido(obj.stream, algoritmo),
+        tamanho=tamanho,
+        content_type=obj.content_type,
+    )
+
+
+def aceita_codificacao(accept_encoding: Optional[str], algoritmo: str) -> bool:
+    """Se o cabeçalho Accept-Encoding do cliente aceita `algoritmo`."""
+    if not accept_encoding:
+        return False
+    for item in accept_encoding.split(","):
+        nome, _, parametros = item.strip().partition(";")
+        if nome.strip().lower() not in (algoritmo, "*"):
+            continue
+        q = parametros.strip()
+        if q.startswith("q="):
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
@@ -0,0 +1,304 @@
+from collections import Counter, defaultdict
+from typing import Iterable, Optional, Sequence
+
+from sqlalchemy import BigInteger, Column, MetaData, Row, Table, delete, insert, literal, select, text
+from sqlalchemy.orm import Session, aliased
+
+from app.models.document import Documento, Tag, TagChave
+from app.schemas.document import DocumentoSelecao, TagCreate, TagOperacao
+from app.utils.estatisticas import registrar_upload
+from app.utils.tag_chaves import chaves_tag
+from app.utils.versoes import incrementar_versoes
+
+# Colunas de tb_documento na mesma ordem dos campos de DocumentoOut.
+DOCUMENTO_COLUNAS = (
+    Documento.id,
+    Documento.uuid,
+    Documento.cliente_id,
+    Documento.bucket_key,
+    Documento.filename,
+    Documento.content_type,
+    Documento.tamanho_bytes,
+    Documento.hash_sha256,
+    Documento.criado_em,
+)
+
+# Colunas de DocumentoMeta (app.utils.metadados_cache), usadas no download.
+META_COLUNAS = (
+    Documento.bucket_key,
+    Documento.filename,
+    Documento.content_type,
+    Documento.hash_sha256,
+    Documento.tamanho_bytes,
+    Documento.compressao,
+    Documento.tamanho_armazenado,
+)
+
+
+# Documentos alvo de aplicar_operacoes_tags, fixados antes da primeira
+# alteração. Tabela temporária da transação (ON COMMIT DROP no Postgres),
+# fora de Base.metadata.
+_ALVOS_TAGS = Table(
+    "tmp_alvos_tags",
+    MetaData(),
+    Column("id", BigInteger, primary_key=True),
+    Column("cliente_id", BigInteger, nullable=False),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+
+def filtros_documento(
+    cliente_id: Optional[int] = None,
+    tag_chave: Optional[str] = None,
+    tag_valor: Optional[str] = None,
+    q: Optional[str] = None,
+) -> list:
+    """
+    Monta as condições de filtro sobre Documento usadas pela busca.
+    Os filtros de tag viram um EXISTS correlacionado, o que dispensa
+    join + DISTINCT na consulta principal.
+    """
+    condicoes = []
+
+    if cliente_id is not None:
+        condicoes.append(Documento.cliente_id == cliente_id)
+
+    if tag_chave is not None or tag_valor is not None or q is not None:
+        # alias para não correlacionar com tb_tags quando o filtro é usado
+        # dentro de um UPDATE/DELETE sobre a própria tabela de tags
+        tag = aliased(Tag)
+        sub = select(tag.id).where(
+            tag.documento_id == Documento.id,
+            tag.cliente_id == Documento.cliente_id,
+        )
+        if cliente_id is not None:
+            # constante explícita para o planner podar partições de tb_tags
+            sub = sub.where(tag.cliente_id == cliente_id)
+
+        if tag_chave is not None:
+            sub = sub.where(tag.chave_id == chave_id_sql(tag_chave))
+
+        if tag_valor is not None:
+            sub = sub.where(tag.valor == tag_valor)
+
+        if q is not None:
+            sub = sub.where(tag.valor.ilike(f"%{q}%"))
+
+        condicoes.append(sub.exists())
+
+    return condicoes
+
+
+def chave_id_sql(chave: str):
+    """Subconsulta escalar com o id de `chave` em tb_tag_chave (NULL se não existe)."""
+    return select(TagChave.id).where(TagChave.chave == chave).scalar_subquery()
+
+
+def condicoes_selecao(selecao: DocumentoSelecao) -> list:
+    """Condições sobre Documento para uma seleção por uuids ou por filtro."""
+    if selecao.uuids is not None:
+        return [Documento.uuid.in_(selecao.uuids)]
+    return filtros_documento(**selecao.filtro.model_dump())
+
+
+def carregar_tags(
+    db: Session,
+    documento_ids: Iterable[int],
+    cliente_id: Optional[int] = None,
+) -> dict[int, list[dict]]:
+    """
+    Busca as tags de um lote de documentos numa única consulta.
+    Retorna {documento_id: [{"chave", "valor", "id"}, ...]}, com as chaves
+    na mesma ordem dos campos de TagOut. Informar `cliente_id`, quando
+    conhecido, limita a leitura à partição do cliente.
+    """
+    ids = list(documento_ids)
+    tags: dict[int, list[dict]] = defaultdict(list)
+    if not ids:
+        return tags
+
+    stmt = select(Tag.documento_id, Tag.id, Tag.chave_id, Tag.valor).where(
+        Tag.documento_id.in_(ids)
+    )
+    if cliente_id is not None:
+        stmt = stmt.where(Tag.cliente_id == cliente_id)
+
+    rows = db.execute(stmt.order_by(Tag.documento_id, Tag.id)).all()
+    nomes = chaves_tag.nomes(db, {row.chave_id for row in rows})
+    for documento_id, tag_id, chave_id, valor in rows:
+        tags[documento_id].append({"chave": nomes[chave_id], "valor": valor, "id": tag_id})
+
+    return tags
+
+
+def documentos_com_tags(
+    db: Session,
+    rows: Sequence[Row],
+    cliente_id: Optional[int] = None,
+) -> list[dict]:
+    """
+    Converte linhas selecionadas com DOCUMENTO_COLUNAS em dicts no formato
+    de DocumentoOut, anexando as tags carregadas em lote.
+    """
+    tags = carregar_tags(db, (row.id for row in rows), cliente_id)
+    return [{**row._asdict(), "tags": tags.get(row.id, [])} for row in rows]
+
+
+def registrar_documento(
+    db: Session,
+    documento: Documento,
+    tags: Iterable[TagCreate],
+) -> None:
+    """
+    Adiciona à sessão um Documento novo com suas tags e soma o upload às
+    estatísticas e à versão do cliente. Usado pelo upload direto e pelo
+    retomável. Não faz commit.
+    """
+    tags = list(tags)
+    chave_ids = chaves_tag.ids(db, {tag.chave for tag in tags})
+    for tag in tags:
+        documento.tags.append(
+            Tag(
+                cliente_id=documento.cliente_id,
+                chave_id=chave_ids[tag.chave],
+                valor=tag.valor,
+            )
+        )
+
+    db.add(documento)
+    registrar_upload(
+        db,
+        documento.cliente_id,
+        documento.content_type,
+        documento.tamanho_bytes,
+        documento.criado_em,
+    )
+    incrementar_versoes(db, [documento.cliente_id])
+
+
+def aplicar_diff_tags(
+    db: Session,
+    documento: Documento,
+    novas: Iterable[TagCreate],
+) -> None:
+    """
+    Leva documento.tags ao conjunto `novas` mexendo só no que mudou:
+    tags iguais ficam intactas, uma tag removida cuja chave reaparece com
+    outro valor vira UPDATE do valor, e o restante vira INSERT/DELETE.
+    """
+    pendentes = Counter((tag.chave, tag.valor) for tag in novas)
+
+    sobrando: dict[str, list[Tag]] = defaultdict(list)
+    for tag in documento.tags:
+        par = (tag.chave, tag.valor)
+        if pendentes[par] > 0:
+            pendentes[par] -= 1
+        else:
+            sobrando[tag.chave].append(tag)
+
+    chave_ids = chaves_tag.ids(
+        db, {chave for (chave, _), n in pendentes.items() if n > 0}
+    )
+    for chave, valor in pendentes.elements():
+        if sobrando[chave]:
+            sobrando[chave].pop().valor = valor
+        else:
+            documento.tags.append(
+                Tag(
+                    cliente_id=documento.cliente_id,
+                    chave_id=chave_ids[chave],
+                    valor=valor,
+                )
+            )
+
+    for tags in sobrando.values():
+        for tag in tags:
+            documento.tags.remove(tag)
+
+
+def aplicar_operacoes_tags(
+    db: Session,
+    condicoes: list,
+    operacoes: Iterable[TagOperacao],
+    cliente_id: Optional[int] = None,
+) -> dict:
+    """
+    Aplica operações add/remove/replace de tags a todos os documentos que
+    atendem `condicoes`, com um INSERT ... SELECT ou DELETE por operação.
+    `cliente_id`, quando a seleção é de um único cliente, restringe os
+    DELETEs em tb_tags à partição dele.
+
+    Os documentos alvo são fixados numa tabela temporária antes da
+    primeira operação: um filtro sobre a própria tag alterada (replace de
+    tipo=rascunho por tipo=final, filtrando tipo=rascunho) deixaria de
+    encontrá-los depois do DELETE. Retorna também `clientes`, os
+    cliente_id dos alvos.
+    Não faz commit: o chamador controla a transação.
+    """
+    conexao = db.connection()
+    _ALVOS_TAGS.create(conexao)
+    total = db.execute(
+        insert(_ALVOS_TAGS).from_select(
+            ["id", "cliente_id"],
+            select(Documento.id, Documento.cliente_id).where(*condicoes),
+        )
+    ).rowcount
+    if conexao.dialect.name == "postgresql":
+        # tabela temporária não passa pelo autovacuum
+        db.execute(text(f"ANALYZE {_ALVOS_TAGS.name}"))
+    clientes = db.scalars(select(_ALVOS_TAGS.c.cliente_id).distinct()).all()
+
+    ids = select(_ALVOS_TAGS.c.id)
+    inseridas = removidas = 0
+
+    for op in operacoes:
+        if op.op in ("remove", "replace"):
+            stmt = delete(Tag).where(
+                Tag.documento_id.in_(ids),
+                Tag.chave_id == chave_id_sql(op.chave),
+            )
+            if cliente_id is not None:
+                stmt = stmt.where(Tag.cliente_id == cliente_id)
+            if op.op == "remove" and op.valor is not None:
+                stmt = stmt.where(Tag.valor == op.valor)
+            if op.op == "replace":
+                stmt = stmt.where(Tag.valor != op.valor)
+            removidas += db.execute(
+                stmt.execution_options(synchronize_session=False)
+            ).rowcount
+
+        if op.op in ("add", "replace"):
+            chave_id = chaves_tag.id(db, op.chave)
+            existente = (
+                select(Tag.id)
+                .where(
+                    Tag.documento_id == _ALVOS_TAGS.c.id,
+                    Tag.cliente_id == _ALVOS_TAGS.c.cliente_id,
+                    Tag.chave_id == chave_id,
+                    Tag.valor == op.valor,
+                )
+                .exists()
+            )
+            origem = select(
+                _ALVOS_TAGS.c.id,
+                _ALVOS_TAGS.c.cliente_id,
+                literal(chave_id),
+                literal(op.valor),
+            ).where(~existente)
+            inseridas += db.execute(
+                insert(Tag).from_select(
+                    ["documento_id", "cliente_id", "chave_id", "valor"], origem
+                )
+            ).rowcount
+
+    # no Postgres o COMMIT já a descartaria; remover aqui permite outra
+    # chamada na mesma transação
+    _ALVOS_TAGS.drop(conexao)
+
+    return {
+        "documentos": total,
+        "inseridas": inseridas,
+        "removidas": removidas,
+        "clientes": clientes,
+    }
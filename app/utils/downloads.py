@@ -0,0 +1,102 @@
+import asyncio
+import os
+from typing import AsyncIterator, Callable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app.storage import ObjetoArmazenado
+
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE", str(1024 * 1024)))
+DOWNLOAD_MAX_CONCURRENT = int(os.getenv("DOWNLOAD_MAX_CONCURRENT", "64"))
+DOWNLOAD_QUEUE_TIMEOUT_SECONDS = float(os.getenv("DOWNLOAD_QUEUE_TIMEOUT_SECONDS", "5"))
+
+
+class LimiteDownloads:
+    """
+    Limita quantos downloads vindos do storage ficam abertos ao mesmo tempo
+    neste worker. Quem não consegue vaga dentro do prazo recebe 503.
+    """
+
+    def __init__(self, maximo: int):
+        self.maximo = maximo
+        self.ativos = 0
+        self.recusados = 0
+        self._semaforo = asyncio.Semaphore(maximo)
+
+    async def adquirir(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._semaforo.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.recusados += 1
+            return False
+        self.ativos += 1
+        return True
+
+    def liberar(self) -> None:
+        self.ativos -= 1
+        self._semaforo.release()
+
+    def metricas(self) -> dict:
+        return {"ativos": self.ativos, "maximo": self.maximo, "recusados": self.recusados}
+
+
+limite_downloads = LimiteDownloads(DOWNLOAD_MAX_CONCURRENT)
+
+
+async def iterar_objeto(
+    obj: ObjetoArmazenado,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Lê o objeto em blocos de `chunk_size` numa thread do pool e os entrega
+    ao event loop. O próximo bloco só é lido depois que o anterior foi
+    enviado, então um cliente lento segura a leitura (backpressure) em vez
+    de acumular bytes em memória.
+    """
+    while True:
+        chunk = await run_in_threadpool(obj.stream.read, chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+class FinalizandoStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse que chama `ao_terminar` quando a resposta acaba,
+    inclusive quando o cliente desconecta e a tarefa é cancelada (por
+    exemplo, para liberar a vaga em limite_downloads).
+    """
+
+    def __init__(self, content, ao_terminar: Optional[Callable[[], None]] = None, **kwargs):
+        self._ao_terminar = ao_terminar
+        super().__init__(content, **kwargs)
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # sem await aqui: o finally também roda sob cancelamento
+            if self._ao_terminar is not None:
+                self._ao_terminar()
+
+
+class ObjetoStreamingResponse(FinalizandoStreamingResponse):
+    """
+    Envia um objeto do storage em streaming assíncrono e fecha o stream do
+    storage ao final, sem depender do coletor de lixo.
+    """
+
+    def __init__(
+        self,
+        obj: ObjetoArmazenado,
+        chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+        ao_terminar: Optional[Callable[[], None]] = None,
+        **kwargs,
+    ):
+        def finalizar() -> None:
+            obj.stream.close()
+            if ao_terminar is not None:
+                ao_terminar()
+
+        super().__init__(iterar_objeto(obj, chunk_size), ao_terminar=finalizar, **kwargs)
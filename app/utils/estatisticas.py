@@ -0,0 +1,84 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.estatistica import ClienteEstatistica, ClienteEstatisticaTipo
+
+
+def _somar(
+    db: Session,
+    cliente_id: int,
+    content_type: str,
+    documentos: int,
+    bytes_: int,
+    upload_em: Optional[datetime] = None,
+) -> None:
+    agora = datetime.utcnow()
+
+    stmt = pg_insert(ClienteEstatistica).values(
+        cliente_id=cliente_id,
+        total_documentos=documentos,
+        total_bytes=bytes_,
+        ultimo_upload_em=upload_em,
+        atualizado_em=agora,
+    )
+    atualizacao = {
+        "total_documentos": ClienteEstatistica.total_documentos + stmt.excluded.total_documentos,
+        "total_bytes": ClienteEstatistica.total_bytes + stmt.excluded.total_bytes,
+        "atualizado_em": stmt.excluded.atualizado_em,
+    }
+    if upload_em is not None:
+        atualizacao["ultimo_upload_em"] = func.greatest(
+            ClienteEstatistica.ultimo_upload_em, stmt.excluded.ultimo_upload_em
+        )
+    db.execute(stmt.on_conflict_do_update(index_elements=["cliente_id"], set_=atualizacao))
+
+    stmt = pg_insert(ClienteEstatisticaTipo).values(
+        cliente_id=cliente_id,
+        content_type=content_type,
+        total_documentos=documentos,
+        total_bytes=bytes_,
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["cliente_id", "content_type"],
+            set_={
+                "total_documentos": ClienteEstatisticaTipo.total_documentos
+                + stmt.excluded.total_documentos,
+                "total_bytes": ClienteEstatisticaTipo.total_bytes + stmt.excluded.total_bytes,
+            },
+        )
+    )
+
+
+def registrar_upload(
+    db: Session,
+    cliente_id: int,
+    content_type: str,
+    tamanho_bytes: int,
+    criado_em: datetime,
+) -> None:
+    """Soma um documento novo às estatísticas do cliente (sem commit)."""
+    _somar(db, cliente_id, content_type, 1, tamanho_bytes, upload_em=criado_em)
+
+
+def registrar_remocoes(db: Session, removidos: Iterable[tuple[int, str, int]]) -> None:
+    """
+    Desconta documentos removidos, dados como (cliente_id, content_type,
+    tamanho_bytes) — por exemplo, o RETURNING de um DELETE. Agrupa antes
+    para fazer um único upsert por cliente/tipo (sem commit), em ordem de
+    (cliente_id, content_type), para que remoções concorrentes travem as
+    linhas sempre na mesma sequência.
+    """
+    deltas: dict[tuple[int, str], list[int]] = defaultdict(lambda: [0, 0])
+    for cliente_id, content_type, tamanho_bytes in removidos:
+        delta = deltas[(cliente_id, content_type)]
+        delta[0] += 1
+        delta[1] += tamanho_bytes
+
+    for (cliente_id, content_type), (documentos, bytes_) in sorted(deltas.items()):
+        _somar(db, cliente_id, content_type, -documentos, -bytes_)
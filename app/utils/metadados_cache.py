@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+METADATA_CACHE_MAX_ITEMS = int(os.getenv("METADATA_CACHE_MAX_ITEMS", "10000"))
+METADATA_CACHE_TTL_SECONDS = float(os.getenv("METADATA_CACHE_TTL_SECONDS", "60"))
+
+
+class DocumentoMeta(NamedTuple):
+    bucket_key: str
+    filename: str
+    content_type: str
+    hash_sha256: Optional[str]
+    tamanho_bytes: int
+    compressao: Optional[str]
+    tamanho_armazenado: Optional[int]
+
+    @property
+    def bytes_armazenados(self) -> int:
+        # documentos anteriores à compressão não têm tamanho_armazenado
+        if self.tamanho_armazenado is None:
+            return self.tamanho_bytes
+        return self.tamanho_armazenado
+
+
+class MetadadosCache:
+    """
+    Cache LRU limitado, em memória do processo, de uuid -> DocumentoMeta.
+
+    As rotas que alteram ou removem documentos invalidam a entrada neste
+    worker; o TTL limita por quanto tempo os demais workers podem servir
+    um valor antigo.
+    """
+
+    def __init__(self, max_itens: int, ttl_segundos: float):
+        self.max_itens = max_itens
+        self.ttl_segundos = ttl_segundos
+        self._itens: OrderedDict[str, tuple[float, DocumentoMeta]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, uuid: str) -> Optional[DocumentoMeta]:
+        with self._lock:
+            item = self._itens.get(uuid)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._itens[uuid]
+                self.misses += 1
+                return None
+            self._itens.move_to_end(uuid)
+            self.hits += 1
+            return item[1]
+
+    def set(self, uuid: str, meta: DocumentoMeta) -> None:
+        with self._lock:
+            self._itens[uuid] = (time.monotonic() + self.ttl_segundos, meta)
+            self._itens.move_to_end(uuid)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def invalidar(self, uuid: str) -> None:
+        with self._lock:
+            self._itens.pop(uuid, None)
+
+    def metricas(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "itens": len(self._itens),
+                "maximo": self.max_itens,
+            }
+
+
+metadados_cache = MetadadosCache(METADATA_CACHE_MAX_ITEMS, METADATA_CACHE_TTL_SECONDS)
@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.outbox import OutboxEvento
+
+
+def enfileirar(
+    db: Session,
+    tipo: str,
+    payload: dict,
+    atraso_segundos: Optional[int] = None,
+) -> OutboxEvento:
+    """
+    Registra um efeito colateral no outbox dentro da transação corrente.
+    Não faz commit: o evento só passa a existir junto com o restante da
+    alteração do chamador.
+    """
+    evento = OutboxEvento(tipo=tipo, payload=payload)
+    if atraso_segundos:
+        evento.disponivel_em = datetime.utcnow() + timedelta(seconds=atraso_segundos)
+
+    db.add(evento)
+    return evento
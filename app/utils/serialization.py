@@ -0,0 +1,20 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+
+
+class OrjsonResponse(Response):
+    """
+    Resposta JSON serializada com orjson.
+
+    Recebe dicts/listas já no formato final (por exemplo, linhas montadas a
+    partir de colunas) e os codifica direto em bytes, sem passar por
+    validação de modelo nem por jsonable_encoder. A saída é idêntica à do
+    JSONResponse padrão para os tipos usados aqui (str, int, None, datetime).
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
@@ -0,0 +1,164 @@
+"""
+SHA-256 cujo estado intermediário pode ser gravado e retomado depois, para
+calcular o hash de um upload retomável recebido em várias requisições
+(hashlib não permite serializar o estado).
+
+O estado é o SHA256_CTX do OpenSSL (112 bytes: h[8], Nl, Nh, data[64],
+num, md_len, em inteiros de 32 bits na ordem nativa). Com a libcrypto
+disponível, as funções SHA256_* dela são usadas via ctypes; sem ela, uma
+implementação em Python puro (bem mais lenta) lê e grava o mesmo formato,
+então um upload pode ser retomado por qualquer worker.
+"""
+import ctypes
+import ctypes.util
+import logging
+import struct
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_ESTADO = 112
+_FORMATO = "=8I2I64s2I"
+
+
+def _carregar_libcrypto():
+    nome = ctypes.util.find_library("crypto")
+    if not nome:
+        return None
+    try:
+        lib = ctypes.CDLL(nome)
+        lib.SHA256_Init.argtypes = [ctypes.c_void_p]
+        lib.SHA256_Update.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_size_t]
+        lib.SHA256_Final.argtypes = [ctypes.c_char_p, ctypes.c_void_p]
+    except (OSError, AttributeError):
+        return None
+    return lib
+
+
+_libcrypto = _carregar_libcrypto()
+if _libcrypto is None:
+    logger.warning("libcrypto não encontrada: o SHA-256 dos uploads retomáveis roda em Python puro")
+
+_H0 = (
+    0x6A09E667, 0xBB67AE85, 0x3C6EF372, 0xA54FF53A,
+    0x510E527F, 0x9B05688C, 0x1F83D9AB, 0x5BE0CD19,
+)
+
+_K = (
+    0x428A2F98, 0x71374491, 0xB5C0FBCF, 0xE9B5DBA5, 0x3956C25B, 0x59F111F1, 0x923F82A4, 0xAB1C5ED5,
+    0xD807AA98, 0x12835B01, 0x243185BE, 0x550C7DC3, 0x72BE5D74, 0x80DEB1FE, 0x9BDC06A7, 0xC19BF174,
+    0xE49B69C1, 0xEFBE4786, 0x0FC19DC6, 0x240CA1CC, 0x2DE92C6F, 0x4A7484AA, 0x5CB0A9DC, 0x76F988DA,
+    0x983E5152, 0xA831C66D, 0xB00327C8, 0xBF597FC7, 0xC6E00BF3, 0xD5A79147, 0x06CA6351, 0x14292967,
+    0x27B70A85, 0x2E1B2138, 0x4D2C6DFC, 0x53380D13, 0x650A7354, 0x766A0ABB, 0x81C2C92E, 0x92722C85,
+    0xA2BFE8A1, 0xA81A664B, 0xC24B8B70, 0xC76C51A3, 0xD192E819, 0xD6990624, 0xF40E3585, 0x106AA070,
+    0x19A4C116, 0x1E376C08, 0x2748774C, 0x34B0BCB5, 0x391C0CB3, 0x4ED8AA4A, 0x5B9CCA4F, 0x682E6FF3,
+    0x748F82EE, 0x78A5636F, 0x84C87814, 0x8CC70208, 0x90BEFFFA, 0xA4506CEB, 0xBEF9A3F7, 0xC67178F2,
+)
+
+
+def _rotr(x: int, n: int) -> int:
+    return ((x >> n) | (x << (32 - n))) & 0xFFFFFFFF
+
+
+def _comprimir(h: list[int], bloco: bytes) -> None:
+    w = list(struct.unpack(">16I", bloco))
+    for i in range(16, 64):
+        s0 = _rotr(w[i - 15], 7) ^ _rotr(w[i - 15], 18) ^ (w[i - 15] >> 3)
+        s1 = _rotr(w[i - 2], 17) ^ _rotr(w[i - 2], 19) ^ (w[i - 2] >> 10)
+        w.append((w[i - 16] + s0 + w[i - 7] + s1) & 0xFFFFFFFF)
+
+    a, b, c, d, e, f, g, hh = h
+    for i in range(64):
+        s1 = _rotr(e, 6) ^ _rotr(e, 11) ^ _rotr(e, 25)
+        ch = (e & f) ^ (~e & g)
+        t1 = (hh + s1 + ch + _K[i] + w[i]) & 0xFFFFFFFF
+        s0 = _rotr(a, 2) ^ _rotr(a, 13) ^ _rotr(a, 22)
+        maj = (a & b) ^ (a & c) ^ (b & c)
+        t2 = (s0 + maj) & 0xFFFFFFFF
+        hh, g, f, e, d, c, b, a = g, f, e, (d + t1) & 0xFFFFFFFF, c, b, a, (t1 + t2) & 0xFFFFFFFF
+
+    for i, valor in enumerate((a, b, c, d, e, f, g, hh)):
+        h[i] = (h[i] + valor) & 0xFFFFFFFF
+
+
+class _Sha256Python:
+    """Implementação de referência usada quando a libcrypto não está disponível."""
+
+    def __init__(self, estado: Optional[bytes] = None):
+        if estado is None:
+            self._h = list(_H0)
+            self._bits = 0
+            self._pendente = b""
+            return
+        campos = struct.unpack(_FORMATO, estado)
+        self._h = list(campos[:8])
+        self._bits = campos[8] | (campos[9] << 32)
+        self._pendente = campos[10][:campos[11]]
+
+    def update(self, dados: bytes) -> None:
+        self._bits = (self._bits + len(dados) * 8) & 0xFFFFFFFFFFFFFFFF
+        dados = self._pendente + bytes(dados)
+        completos = len(dados) - len(dados) % 64
+        for i in range(0, completos, 64):
+            _comprimir(self._h, dados[i:i + 64])
+        self._pendente = dados[completos:]
+
+    def estado(self) -> bytes:
+        return struct.pack(
+            _FORMATO,
+            *self._h,
+            self._bits & 0xFFFFFFFF,
+            self._bits >> 32,
+            self._pendente.ljust(64, b"\0"),
+            len(self._pendente),
+            32,
+        )
+
+    def digest(self) -> bytes:
+        h = list(self._h)
+        final = self._pendente + b"\x80"
+        final += b"\0" * ((56 - len(final)) % 64) + struct.pack(">Q", self._bits)
+        for i in range(0, len(final), 64):
+            _comprimir(h, final[i:i + 64])
+        return struct.pack(">8I", *h)
+
+
+class _Sha256Libcrypto:
+    def __init__(self, estado: Optional[bytes] = None):
+        self._ctx = ctypes.create_string_buffer(TAMANHO_ESTADO)
+        if estado is None:
+            _libcrypto.SHA256_Init(self._ctx)
+        else:
+            ctypes.memmove(self._ctx, estado, TAMANHO_ESTADO)
+
+    def update(self, dados: bytes) -> None:
+        _libcrypto.SHA256_Update(self._ctx, bytes(dados), len(dados))
+
+    def estado(self) -> bytes:
+        return self._ctx.raw
+
+    def digest(self) -> bytes:
+        # SHA256_Final altera o contexto: finaliza uma cópia
+        copia = ctypes.create_string_buffer(self._ctx.raw, TAMANHO_ESTADO)
+        saida = ctypes.create_string_buffer(32)
+        _libcrypto.SHA256_Final(saida, copia)
+        return saida.raw
+
+
+class Sha256Retomavel:
+    """SHA-256 com estado exportável (`estado()`) e retomável (`Sha256Retomavel(estado)`)."""
+
+    def __init__(self, estado: Optional[bytes] = None):
+        if estado is not None and len(estado) != TAMANHO_ESTADO:
+            raise ValueError("Estado de SHA-256 inválido")
+        impl = _Sha256Libcrypto if _libcrypto is not None else _Sha256Python
+        self._impl = impl(estado)
+
+    def update(self, dados: bytes) -> None:
+        self._impl.update(dados)
+
+    def estado(self) -> bytes:
+        return self._impl.estado()
+
+    def hexdigest(self) -> str:
+        return self._impl.digest().hex()
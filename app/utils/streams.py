@@ -0,0 +1,44 @@
+import hashlib
+from typing import BinaryIO
+
+
+class LeitorComHash:
+    """
+    Envolve um arquivo binário e calcula SHA-256 e tamanho à medida que os
+    bytes são lidos, para que o upload percorra o conteúdo uma única vez.
+    """
+
+    def __init__(self, fileobj: BinaryIO):
+        self._fileobj = fileobj
+        self._sha256 = hashlib.sha256()
+        self.tamanho = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._fileobj.read(size)
+        if chunk:
+            self._sha256.update(chunk)
+            self.tamanho += len(chunk)
+        return chunk
+
+    def hexdigest(self) -> str:
+        return self._sha256.hexdigest()
+
+
+class LeitorLimitado:
+    """Lê no máximo `limite` bytes de um arquivo já posicionado."""
+
+    def __init__(self, fileobj: BinaryIO, limite: int):
+        self._fileobj = fileobj
+        self._restante = limite
+
+    def read(self, size: int = -1) -> bytes:
+        if self._restante <= 0:
+            return b""
+        if size is None or size < 0 or size > self._restante:
+            size = self._restante
+        chunk = self._fileobj.read(size)
+        self._restante -= len(chunk)
+        return chunk
+
+    def close(self) -> None:
+        self._fileobj.close()
@@ -0,0 +1,153 @@
+import os
+import threading
+from typing import Iterable
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.document import TagChave
+
+TAG_CHAVE_CACHE_MAX_ITEMS = int(os.getenv("TAG_CHAVE_CACHE_MAX_ITEMS", "10000"))
+
+# Em Session.info: chaves criadas na transação corrente, que só entram no
+# cache depois do commit.
+_PENDENTES = "chaves_tag_pendentes"
+
+
+class ChavesTag:
+    """
+    Cache em memória do processo de chave de tag <-> TagChave.id.
+
+    As chaves nunca são renomeadas nem removidas de tb_tag_chave, então o
+    cache não precisa de invalidação nem de TTL. Se passar de `max_itens`
+    (chaves livres demais vindas dos clientes) ele é esvaziado e volta a
+    encher com as chaves em uso.
+    """
+
+    def __init__(self, max_itens: int):
+        self.max_itens = max_itens
+        self._por_chave: dict[str, int] = {}
+        self._por_id: dict[int, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _guardar(self, pares: Iterable[tuple[int, str]]) -> None:
+        with self._lock:
+            for chave_id, chave in pares:
+                if len(self._por_id) >= self.max_itens:
+                    self._por_chave.clear()
+                    self._por_id.clear()
+                self._por_chave[chave] = chave_id
+                self._por_id[chave_id] = chave
+
+    def ids(self, db: Session, chaves: Iterable[str]) -> dict[str, int]:
+        """
+        Retorna {chave: id}, criando em tb_tag_chave as chaves que ainda
+        não existem.
+
+        A criação usa a conexão da própria requisição, num SAVEPOINT, e faz
+        parte da transação dela. As chaves que ela criou só entram no cache
+        depois do commit: um rollback as desfaz, e o cache nunca guarda um
+        id que não existe. As que já existiam entram no cache na hora.
+        """
+        resultado: dict[str, int] = {}
+        faltando: set[str] = set()
+        with self._lock:
+            for chave in chaves:
+                chave_id = self._por_chave.get(chave)
+                if chave_id is None:
+                    faltando.add(chave)
+                else:
+                    resultado[chave] = chave_id
+            self.hits += len(resultado)
+            self.misses += len(faltando)
+
+        if faltando:
+            with db.begin_nested():
+                # ordenadas, para que criações concorrentes travem as
+                # chaves sempre na mesma sequência
+                criadas = {
+                    tuple(par)
+                    for par in db.execute(
+                        pg_insert(TagChave)
+                        .values([{"chave": chave} for chave in sorted(faltando)])
+                        .on_conflict_do_nothing(index_elements=["chave"])
+                        .returning(TagChave.id, TagChave.chave)
+                    )
+                }
+                pares = [
+                    tuple(par)
+                    for par in db.execute(
+                        select(TagChave.id, TagChave.chave).where(TagChave.chave.in_(faltando))
+                    )
+                ]
+            self._guardar(par for par in pares if par not in criadas)
+            if criadas:
+                db.info.setdefault(_PENDENTES, []).extend(criadas)
+            resultado.update({chave: chave_id for chave_id, chave in pares})
+
+        return resultado
+
+    def id(self, db: Session, chave: str) -> int:
+        return self.ids(db, [chave])[chave]
+
+    def nomes(self, db: Session, chave_ids: Iterable[int]) -> dict[int, str]:
+        """Retorna {id: chave}, buscando numa única consulta os ids fora do cache."""
+        resultado: dict[int, str] = {}
+        faltando: set[int] = set()
+        with self._lock:
+            for chave_id in chave_ids:
+                chave = self._por_id.get(chave_id)
+                if chave is None:
+                    faltando.add(chave_id)
+                else:
+                    resultado[chave_id] = chave
+            self.hits += len(resultado)
+            self.misses += len(faltando)
+
+        if faltando:
+            pares = db.execute(
+                select(TagChave.id, TagChave.chave).where(TagChave.id.in_(faltando))
+            ).all()
+            self._guardar(pares)
+            resultado.update(dict(pares))
+
+        return resultado
+
+    def metricas(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "itens": len(self._por_id),
+                "maximo": self.max_itens,
+            }
+
+
+chaves_tag = ChavesTag(TAG_CHAVE_CACHE_MAX_ITEMS)
+
+
+@event.listens_for(Session, "after_commit")
+def _guardar_pendentes(sessao: Session) -> None:
+    # o RELEASE de um SAVEPOINT também dispara after_commit
+    if sessao.in_nested_transaction():
+        return
+    pendentes = sessao.info.pop(_PENDENTES, None)
+    if pendentes:
+        chaves_tag._guardar(pendentes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_pendentes(sessao: Session) -> None:
+    # também no rollback de um SAVEPOINT, que pode ter desfeito chaves
+    # criadas dentro dele; no pior caso a chave só volta a ser buscada
+    sessao.info.pop(_PENDENTES, None)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _encerrar_pendentes(sessao: Session, transacao) -> None:
+    # close() sem commit encerra a transação sem after_rollback
+    if transacao.parent is None:
+        sessao.info.pop(_PENDENTES, None)
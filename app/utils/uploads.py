@@ -0,0 +1,220 @@
+import asyncio
+import os
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+
+UPLOAD_MAX_CONCURRENT = int(os.getenv("UPLOAD_MAX_CONCURRENT", "32"))
+UPLOAD_MAX_INFLIGHT_BYTES = int(os.getenv("UPLOAD_MAX_INFLIGHT_BYTES", str(1024**3)))
+UPLOAD_CLIENTE_MAX_CONCURRENT = int(os.getenv("UPLOAD_CLIENTE_MAX_CONCURRENT", "8"))
+UPLOAD_CLIENTE_MAX_INFLIGHT_BYTES = int(
+    os.getenv("UPLOAD_CLIENTE_MAX_INFLIGHT_BYTES", str(256 * 1024**2))
+)
+# Reservado para um upload sem Content-Length (corpo chunked).
+UPLOAD_RESERVA_PADRAO_BYTES = int(os.getenv("UPLOAD_RESERVA_PADRAO_BYTES", str(64 * 1024**2)))
+UPLOAD_QUEUE_TIMEOUT_SECONDS = float(os.getenv("UPLOAD_QUEUE_TIMEOUT_SECONDS", "5"))
+UPLOAD_RETRY_AFTER_SECONDS = int(os.getenv("UPLOAD_RETRY_AFTER_SECONDS", "2"))
+
+ROTA_UPLOAD = "/documents/upload"
+
+
+def _cabe(ativos: int, em_uso: int, tamanho: int, max_ativos: int, max_bytes: int) -> bool:
+    # limite 0 = sem limite; um upload sozinho sempre passa, mesmo maior
+    # que o orçamento inteiro, para não ficar preso para sempre
+    if max_ativos and ativos >= max_ativos:
+        return False
+    return not max_bytes or ativos == 0 or em_uso + tamanho <= max_bytes
+
+
+class AdmissaoUploads:
+    """
+    Orçamento de uploads em andamento neste worker: quantidade e bytes
+    (pelo Content-Length), no total e por cliente_id. Uploads sem cliente
+    informado (cliente_id None) dividem um único orçamento com os mesmos
+    limites de um cliente. Quem não cabe espera até o prazo; se ainda não
+    couber, é recusado (429 quando o limite estourado é o do cliente, 503
+    quando é o do worker).
+
+    Roda só no event loop, então os contadores dispensam lock.
+    """
+
+    def __init__(
+        self,
+        max_uploads: int,
+        max_bytes: int,
+        max_uploads_cliente: int,
+        max_bytes_cliente: int,
+    ):
+        self.max_uploads = max_uploads
+        self.max_bytes = max_bytes
+        self.max_uploads_cliente = max_uploads_cliente
+        self.max_bytes_cliente = max_bytes_cliente
+
+        self.ativos = 0
+        self.bytes_em_uso = 0
+        self._clientes: dict[Optional[int], list[int]] = {}
+        self._esperas: list[asyncio.Future] = []
+
+        self.aguardando = 0
+        self.recusados_cliente = 0
+        self.recusados_worker = 0
+
+    def _cabe_cliente(self, cliente_id: Optional[int], tamanho: int) -> bool:
+        ativos, em_uso = self._clientes.get(cliente_id, (0, 0))
+        return _cabe(ativos, em_uso, tamanho, self.max_uploads_cliente, self.max_bytes_cliente)
+
+    def _cabe_worker(self, tamanho: int) -> bool:
+        return _cabe(self.ativos, self.bytes_em_uso, tamanho, self.max_uploads, self.max_bytes)
+
+    async def adquirir(
+        self,
+        cliente_id: Optional[int],
+        tamanho: int,
+        timeout: float,
+    ) -> Optional[str]:
+        """
+        Reserva a vaga e os bytes. Retorna None quando admitido, ou o
+        motivo da recusa ("cliente" ou "worker") se o prazo acabar.
+        """
+        loop = asyncio.get_running_loop()
+        prazo = loop.time() + timeout
+
+        self.aguardando += 1
+        try:
+            while not (self._cabe_cliente(cliente_id, tamanho) and self._cabe_worker(tamanho)):
+                restante = prazo - loop.time()
+                if restante <= 0:
+                    if not self._cabe_cliente(cliente_id, tamanho):
+                        self.recusados_cliente += 1
+                        return "cliente"
+                    self.recusados_worker += 1
+                    return "worker"
+
+                espera = loop.create_future()
+                self._esperas.append(espera)
+                try:
+                    await asyncio.wait_for(espera, restante)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    if espera in self._esperas:
+                        self._esperas.remove(espera)
+        finally:
+            self.aguardando -= 1
+
+        self.ativos += 1
+        self.bytes_em_uso += tamanho
+        uso = self._clientes.setdefault(cliente_id, [0, 0])
+        uso[0] += 1
+        uso[1] += tamanho
+        return None
+
+    def liberar(self, cliente_id: Optional[int], tamanho: int) -> None:
+        self.ativos -= 1
+        self.bytes_em_uso -= tamanho
+        uso = self._clientes[cliente_id]
+        uso[0] -= 1
+        uso[1] -= tamanho
+        if uso[0] == 0:
+            del self._clientes[cliente_id]
+
+        # acorda todos os que esperam; cada um confere de novo se cabe
+        esperas, self._esperas = self._esperas, []
+        for espera in esperas:
+            if not espera.done():
+                espera.set_result(None)
+
+    def metricas(self) -> dict:
+        return {
+            "ativos": self.ativos,
+            "maximo": self.max_uploads,
+            "bytes_em_uso": self.bytes_em_uso,
+            "bytes_maximo": self.max_bytes,
+            "aguardando": self.aguardando,
+            "recusados_cliente": self.recusados_cliente,
+            "recusados_worker": self.recusados_worker,
+            "por_cliente": {
+                ("sem_cliente" if cliente_id is None else str(cliente_id)): {
+                    "ativos": ativos,
+                    "bytes_em_uso": em_uso,
+                }
+                for cliente_id, (ativos, em_uso) in self._clientes.items()
+            },
+        }
+
+
+admissao_uploads = AdmissaoUploads(
+    UPLOAD_MAX_CONCURRENT,
+    UPLOAD_MAX_INFLIGHT_BYTES,
+    UPLOAD_CLIENTE_MAX_CONCURRENT,
+    UPLOAD_CLIENTE_MAX_INFLIGHT_BYTES,
+)
+
+
+def recusa_upload(motivo: str) -> tuple[int, str, dict]:
+    """Status, mensagem e cabeçalhos da resposta para um upload recusado."""
+    headers = {"Retry-After": str(UPLOAD_RETRY_AFTER_SECONDS)}
+    if motivo == "cliente":
+        return 429, "Limite de uploads simultâneos do cliente atingido. Tente novamente em instantes.", headers
+    return 503, "Muitos uploads simultâneos. Tente novamente em instantes.", headers
+
+
+class AdmissaoUploadsMiddleware:
+    """
+    Aplica admissao_uploads ao POST /documents/upload antes de o corpo ser
+    lido: a rota só recebe o arquivo depois de o formulário multipart
+    inteiro chegar, tarde demais para uma dependência do FastAPI. O
+    cliente vem do cabeçalho X-Cliente-Id ou do parâmetro cliente_id, se
+    informado (a rota confere que é o mesmo do meta); sem ele, o upload
+    conta no orçamento compartilhado dos uploads sem cliente. O tamanho
+    vem do Content-Length ou, sem ele, é UPLOAD_RESERVA_PADRAO_BYTES.
+
+    Deve ser registrado antes do CORSMiddleware, para que as recusas
+    também levem os cabeçalhos de CORS.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"].rstrip("/") != ROTA_UPLOAD
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {nome.lower(): valor for nome, valor in scope["headers"]}
+        try:
+            tamanho = int(headers[b"content-length"])
+        except (KeyError, ValueError):
+            tamanho = UPLOAD_RESERVA_PADRAO_BYTES
+
+        cliente_id = _cliente_id(headers.get(b"x-cliente-id"), scope.get("query_string", b""))
+
+        motivo = await admissao_uploads.adquirir(cliente_id, tamanho, UPLOAD_QUEUE_TIMEOUT_SECONDS)
+        if motivo is not None:
+            status_code, detalhe, cabecalhos = recusa_upload(motivo)
+            resposta = JSONResponse({"detail": detalhe}, status_code=status_code, headers=cabecalhos)
+            await resposta(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admissao_uploads.liberar(cliente_id, tamanho)
+
+
+def _cliente_id(cabecalho: Optional[bytes], query_string: bytes) -> Optional[int]:
+    valor = cabecalho
+    if valor is None:
+        for par in query_string.split(b"&"):
+            nome, _, conteudo = par.partition(b"=")
+            if nome == b"cliente_id":
+                valor = conteudo
+                break
+    try:
+        return int(valor) if valor is not None else None
+    except ValueError:
+        return None
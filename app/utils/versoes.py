@@ -0,0 +1,60 @@
+import hashlib
+from typing import Iterable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.versao import ClienteVersao
+
+
+def incrementar_versoes(db: Session, cliente_ids: Iterable[int]) -> None:
+    """
+    Incrementa a versão de cada cliente (sem commit). Os clientes são
+    atualizados em ordem para que transações concorrentes travem as linhas
+    sempre na mesma sequência.
+    """
+    clientes = sorted(set(cliente_ids))
+    if not clientes:
+        return
+
+    stmt = pg_insert(ClienteVersao).values(
+        [{"cliente_id": cliente_id, "versao": 1} for cliente_id in clientes]
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["cliente_id"],
+            set_={"versao": ClienteVersao.versao + 1},
+        )
+    )
+
+
+def versao_atual(db: Session, cliente_id: Optional[int] = None) -> int:
+    """
+    Versão de um cliente ou, sem cliente_id, a soma das versões de todos
+    (muda sempre que qualquer cliente muda).
+    """
+    if cliente_id is not None:
+        versao = db.scalar(
+            select(ClienteVersao.versao).where(ClienteVersao.cliente_id == cliente_id)
+        )
+        return versao or 0
+    return db.scalar(select(func.coalesce(func.sum(ClienteVersao.versao), 0)))
+
+
+def gerar_etag(*partes) -> str:
+    """ETag fraco a partir da versão e dos parâmetros da consulta."""
+    digest = hashlib.sha1(repr(partes).encode("utf-8")).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_confere(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparação fraca de If-None-Match (lista separada por vírgulas ou *)."""
+    if not if_none_match:
+        return False
+    valor = etag.removeprefix("W/")
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or candidato.removeprefix("W/") == valor:
+            return True
+    return False
@@ -0,0 +1,159 @@
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, Optional
+
+from app.storage import ObjetoArmazenado
+from app.utils.compressao import descomprimir
+
+ZIP_CHUNK_SIZE = int(os.getenv("ZIP_CHUNK_SIZE", str(1024 * 1024)))
+ZIP_PREFETCH = int(os.getenv("ZIP_PREFETCH", "4"))
+
+# Tipos que já chegam comprimidos: deflate só gastaria CPU.
+TIPOS_JA_COMPRIMIDOS = (
+    "image/jpeg",
+    "image/png",
+    "image/gif",
+    "image/webp",
+    "image/heic",
+    "application/pdf",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/x-7z-compressed",
+    "application/x-rar-compressed",
+    "application/vnd.rar",
+    "application/zstd",
+    "application/vnd.openxmlformats-officedocument.",
+    "application/vnd.oasis.opendocument.",
+    "video/",
+    "audio/",
+)
+
+
+@dataclass
+class MembroZip:
+    filename: str
+    bucket_key: str
+    content_type: str
+    tamanho_bytes: int
+    criado_em: datetime
+    compressao: Optional[str] = None
+
+
+class _Saida:
+    """Destino de escrita do ZipFile: acumula o que foi escrito até ser drenado."""
+
+    def __init__(self):
+        self._partes: list[bytes] = []
+
+    def write(self, dados) -> int:
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self) -> None:
+        pass
+
+    def drenar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def _compressao(content_type: str) -> int:
+    if content_type.startswith(TIPOS_JA_COMPRIMIDOS):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _nome_unico(filename: str, usados: set[str]) -> str:
+    nome = filename.replace("/", "_").replace("\\", "_") or "arquivo"
+    base, ext = os.path.splitext(nome)
+    candidato = nome
+    n = 1
+    while candidato in usados:
+        n += 1
+        candidato = f"{base} ({n}){ext}"
+    usados.add(candidato)
+    return candidato
+
+
+def gerar_zip(
+    membros: Iterable[MembroZip],
+    abrir: Callable[[str], ObjetoArmazenado],
+) -> Iterator[bytes]:
+    """
+    Gera um arquivo ZIP em streaming com um membro por documento.
+
+    O ZipFile escreve num destino não posicionável, então cada entrada usa
+    data descriptor e nada precisa ser reescrito: os bytes saem assim que
+    produzidos, bloco a bloco. Até ZIP_PREFETCH objetos seguintes são
+    abertos em paralelo (só a conexão/primeiro byte; o conteúdo não é
+    lido adiantado), o que esconde a latência do storage entre membros.
+
+    Objetos que não puderem ser lidos são pulados e listados em
+    _ERROS.txt no final do arquivo.
+    """
+    saida = _Saida()
+    usados: set[str] = set()
+    erros: list[str] = []
+    pendentes: deque[tuple[MembroZip, Future]] = deque()
+    membros = iter(membros)
+
+    with ThreadPoolExecutor(max_workers=max(ZIP_PREFETCH, 1)) as pool:
+
+        def agendar() -> None:
+            while len(pendentes) < max(ZIP_PREFETCH, 1):
+                membro = next(membros, None)
+                if membro is None:
+                    return
+                pendentes.append((membro, pool.submit(abrir, membro.bucket_key)))
+
+        try:
+            with zipfile.ZipFile(saida, mode="w", allowZip64=True) as zf:
+                agendar()
+                while pendentes:
+                    membro, futuro = pendentes.popleft()
+                    agendar()
+
+                    try:
+                        obj = descomprimir(
+                            futuro.result(), membro.compressao, membro.tamanho_bytes
+                        )
+                    except Exception as e:
+                        erros.append(f"{membro.filename} ({membro.bucket_key}): {e}")
+                        continue
+
+                    info = zipfile.ZipInfo(
+                        _nome_unico(membro.filename, usados),
+                        date_time=membro.criado_em.timetuple()[:6],
+                    )
+                    info.compress_type = _compressao(membro.content_type)
+                    info.file_size = membro.tamanho_bytes
+
+                    try:
+                        with zf.open(info, mode="w") as destino:
+                            while chunk := obj.stream.read(ZIP_CHUNK_SIZE):
+                                destino.write(chunk)
+                                yield saida.drenar()
+                    finally:
+                        obj.stream.close()
+                    yield saida.drenar()
+
+                if erros:
+                    zf.writestr("_ERROS.txt", "\n".join(erros) + "\n")
+            yield saida.drenar()
+        finally:
+            # resposta interrompida: fecha o que já foi (ou ainda será)
+            # aberto adiantado
+            for _, futuro in pendentes:
+                if not futuro.cancel():
+                    futuro.add_done_callback(_fechar_aberto)
+
+
+def _fechar_aberto(futuro: Future) -> None:
+    if futuro.exception() is None:
+        futuro.result().stream.close()
@@ -0,0 +1,70 @@
+"""
+Vazão do pipeline de download: caminho antigo (gerador síncrono com
+iter_chunks de 8 KiB, um salto ao threadpool por bloco) contra o novo
+(iterar_objeto assíncrono com DOWNLOAD_CHUNK_SIZE).
+
+Os dois leem de um botocore StreamingBody sobre bytes em memória, de modo
+que a medida isola o custo por bloco do lado da aplicação.
+
+Uso: python -m benchmarks.bench_download [tamanho_mib] [chunk_kib]
+"""
+import asyncio
+import io
+import sys
+import time
+
+from botocore.response import StreamingBody
+from starlette.concurrency import iterate_in_threadpool
+
+from app.storage import ObjetoArmazenado
+from app.utils.downloads import DOWNLOAD_CHUNK_SIZE, iterar_objeto
+
+
+def _body(dados: bytes) -> StreamingBody:
+    return StreamingBody(io.BytesIO(dados), len(dados))
+
+
+async def caminho_antigo(dados: bytes) -> int:
+    body = _body(dados)
+
+    def iterfile():
+        for chunk in body.iter_chunks(chunk_size=8192):
+            if chunk:
+                yield chunk
+
+    total = 0
+    async for chunk in iterate_in_threadpool(iterfile()):
+        total += len(chunk)
+    return total
+
+
+async def caminho_novo(dados: bytes, chunk_size: int) -> int:
+    obj = ObjetoArmazenado(stream=_body(dados), tamanho=len(dados))
+    total = 0
+    async for chunk in iterar_objeto(obj, chunk_size):
+        total += len(chunk)
+    return total
+
+
+async def medir(coro_fn, *args) -> float:
+    inicio = time.perf_counter()
+    total = await coro_fn(*args)
+    duracao = time.perf_counter() - inicio
+    return total / duracao / (1024 * 1024)
+
+
+async def main() -> None:
+    tamanho_mib = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    chunk_size = int(sys.argv[2]) * 1024 if len(sys.argv) > 2 else DOWNLOAD_CHUNK_SIZE
+    dados = b"\0" * (tamanho_mib * 1024 * 1024)
+
+    antigo = await medir(caminho_antigo, dados)
+    novo = await medir(caminho_novo, dados, chunk_size)
+
+    print(f"objeto={tamanho_mib} MiB")
+    print(f"antigo (8 KiB, gerador síncrono): {antigo:8.0f} MiB/s")
+    print(f"novo ({chunk_size // 1024} KiB, assíncrono):    {novo:8.0f} MiB/s  ({novo / antigo:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
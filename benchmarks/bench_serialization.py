@@ -0,0 +1,100 @@
+"""
+Compara a serialização de listagens de documentos:
+
+- atual: objetos ORM -> DocumentoOut (from_attributes) -> jsonable_encoder
+  -> JSONResponse;
+- rápida: linhas em dict -> OrjsonResponse.
+
+Não usa banco: gera linhas sintéticas com o mesmo formato de
+DOCUMENTO_COLUNAS/carregar_tags e confere que os bytes são idênticos.
+
+Uso: python -m benchmarks.bench_serialization [n_documentos] [tags_por_doc]
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.schemas.document import DocumentoOut
+from app.utils.serialization import OrjsonResponse
+
+
+def gerar_linhas(n_docs: int, n_tags: int) -> list[dict]:
+    base = datetime(2024, 1, 1, 8, 30)
+    docs = []
+    tag_id = 0
+    for i in range(n_docs):
+        tags = []
+        for j in range(n_tags):
+            tag_id += 1
+            tags.append({"chave": f"chave_{j}", "valor": f"valor ção {i}-{j}", "id": tag_id})
+        docs.append(
+            {
+                "id": i + 1,
+                "uuid": f"{i:012d}",
+                "cliente_id": 42,
+                "bucket_key": f"42/2024-01-01/{i:012d}.pdf",
+                "filename": f"holerite_{i}.pdf",
+                "content_type": "application/pdf",
+                "tamanho_bytes": 1024 * i,
+                "hash_sha256": None if i % 7 == 0 else "a" * 64,
+                "criado_em": base + timedelta(seconds=i, microseconds=(i * 37) % 1_000_000),
+                "tags": tags,
+            }
+        )
+    return docs
+
+
+def como_orm(docs: list[dict]) -> list[SimpleNamespace]:
+    return [
+        SimpleNamespace(**{**doc, "tags": [SimpleNamespace(**t) for t in doc["tags"]]})
+        for doc in docs
+    ]
+
+
+def caminho_atual(objetos: list[SimpleNamespace]) -> bytes:
+    adapter = TypeAdapter(List[DocumentoOut])
+    validado = adapter.validate_python(objetos, from_attributes=True)
+    return JSONResponse(jsonable_encoder(validado)).body
+
+
+def caminho_rapido(docs: list[dict]) -> bytes:
+    return OrjsonResponse(docs).body
+
+
+def medir(fn, arg, repeticoes: int) -> float:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        fn(arg)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main() -> None:
+    n_docs = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    n_tags = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    docs = gerar_linhas(n_docs, n_tags)
+    objetos = como_orm(docs)
+
+    atual = caminho_atual(objetos)
+    rapido = caminho_rapido(docs)
+    if atual != rapido:
+        raise SystemExit("Saídas diferentes entre o caminho atual e o rápido.")
+
+    t_atual = medir(caminho_atual, objetos, 5)
+    t_rapido = medir(caminho_rapido, docs, 5)
+
+    print(f"documentos={n_docs} tags/doc={n_tags} bytes={len(rapido)} saída idêntica")
+    print(f"atual : {t_atual * 1000:8.1f} ms")
+    print(f"rápido: {t_rapido * 1000:8.1f} ms  ({t_atual / t_rapido:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
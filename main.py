@@ -1,14 +1,43 @@
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.database.connection import engine, Base
 from app.models.auth import Pessoa, Usuario
 from app.models.document import Documento, Tag
+from app.models.estatistica import ClienteEstatistica, ClienteEstatisticaTipo
+from app.models.outbox import OutboxEvento
+from app.models.upload import UploadSessao
+from app.models.versao import ClienteVersao
 from app.routes import api_router
+from app.utils.uploads import AdmissaoUploadsMiddleware
 
+# Só cria as tabelas que faltam; colunas e índices novos em tabelas
+# existentes vêm de `python -m app.jobs.migrar`, rodado antes do deploy.
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="ZionGED API")
+# Roda o worker do outbox dentro do processo da API; em produção ele pode
+# rodar à parte com `python -m app.jobs.outbox_worker`.
+OUTBOX_WORKER_EMBUTIDO = os.getenv("OUTBOX_WORKER_EMBUTIDO", "false").lower() == "true"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    parar = None
+    if OUTBOX_WORKER_EMBUTIDO:
+        from app.jobs.outbox_worker import iniciar_workers
+
+        parar = iniciar_workers()
+    yield
+    if parar is not None:
+        parar.set()
+
+
+app = FastAPI(title="ZionGED API", lifespan=lifespan)
 
+# Registrado antes do CORS, que fica por fora e também cobre as recusas.
+app.add_middleware(AdmissaoUploadsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -0,0 +1,55 @@
+import os
+
+# app.database.connection monta a URL do Postgres ao ser importado; os
+# testes usam SQLite em memória e só precisam que as variáveis existam.
+for _nome, _valor in (
+    ("DB_HOST", "localhost"),
+    ("DB_PORT", "5432"),
+    ("DB_NAME", "teste"),
+    ("DB_USER", "teste"),
+    ("DB_PASSWORD", "teste"),
+):
+    os.environ.setdefault(_nome, _valor)
+
+import pytest
+from sqlalchemy import BigInteger, create_engine, event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401  registra todas as tabelas em Base.metadata
+from app.database.connection import Base
+from app.utils.tag_chaves import chaves_tag
+
+
+@compiles(BigInteger, "sqlite")
+def _bigint_sqlite(tipo, compilador, **kw):
+    # no SQLite só INTEGER PRIMARY KEY é autoincremento
+    return "INTEGER"
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+    # sem isto o pysqlite não abre a transação antes de um SAVEPOINT, e o
+    # RELEASE dele confirma tudo (receita da documentação do SQLAlchemy)
+    @event.listens_for(engine, "connect")
+    def _autocommit_driver(conexao_dbapi, registro):
+        conexao_dbapi.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(conexao):
+        conexao.exec_driver_sql("BEGIN")
+
+    Base.metadata.create_all(engine)
+    # ids de chave em cache valem só para o banco do teste anterior
+    chaves_tag._por_chave.clear()
+    chaves_tag._por_id.clear()
+    with Session(engine) as sessao:
+        yield sessao
+    engine.dispose()
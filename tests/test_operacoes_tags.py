@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from app.models.document import Documento, Tag
+from app.schemas.document import DocumentoFiltro, TagOperacao
+from app.utils.documentos import aplicar_operacoes_tags, carregar_tags, filtros_documento
+from app.utils.tag_chaves import chaves_tag
+
+
+def _documento(db, id, cliente_id, tags):
+    db.add(
+        Documento(
+            id=id,
+            uuid=f"doc{id:09d}",
+            cliente_id=cliente_id,
+            bucket_key=f"{cliente_id}/{id}.pdf",
+            filename=f"{id}.pdf",
+            content_type="application/pdf",
+            tamanho_bytes=1,
+            criado_em=datetime(2024, 1, 1),
+        )
+    )
+    for chave, valor in tags:
+        db.add(
+            Tag(
+                documento_id=id,
+                cliente_id=cliente_id,
+                chave_id=chaves_tag.id(db, chave),
+                valor=valor,
+            )
+        )
+    db.flush()
+
+
+def _tags(db, id):
+    return sorted((tag["chave"], tag["valor"]) for tag in carregar_tags(db, [id])[id])
+
+
+def test_replace_filtrando_pela_mesma_chave(db):
+    _documento(db, 1, 10, [("tipo", "rascunho"), ("setor", "rh")])
+    _documento(db, 2, 20, [("tipo", "rascunho")])
+    _documento(db, 3, 10, [("tipo", "contrato")])
+
+    filtro = DocumentoFiltro(tag_chave="tipo", tag_valor="rascunho")
+    resultado = aplicar_operacoes_tags(
+        db,
+        filtros_documento(**filtro.model_dump()),
+        [TagOperacao(op="replace", chave="tipo", valor="final")],
+    )
+
+    assert resultado["documentos"] == 2
+    assert resultado["removidas"] == 2
+    assert resultado["inseridas"] == 2
+    assert sorted(resultado["clientes"]) == [10, 20]
+    assert _tags(db, 1) == [("setor", "rh"), ("tipo", "final")]
+    assert _tags(db, 2) == [("tipo", "final")]
+    assert _tags(db, 3) == [("tipo", "contrato")]
+
+
+def test_operacoes_seguintes_usam_a_mesma_selecao(db):
+    _documento(db, 1, 10, [("tipo", "rascunho")])
+    _documento(db, 2, 10, [("tipo", "contrato")])
+
+    filtro = DocumentoFiltro(tag_chave="tipo", tag_valor="rascunho")
+    resultado = aplicar_operacoes_tags(
+        db,
+        filtros_documento(**filtro.model_dump()),
+        [
+            TagOperacao(op="remove", chave="tipo", valor="rascunho"),
+            TagOperacao(op="add", chave="revisado", valor="sim"),
+        ],
+    )
+
+    assert resultado["documentos"] == 1
+    assert _tags(db, 1) == [("revisado", "sim")]
+    assert _tags(db, 2) == [("tipo", "contrato")]
+
+    # a tabela temporária é descartada: outra chamada na mesma transação funciona
+    aplicar_operacoes_tags(
+        db,
+        filtros_documento(cliente_id=10),
+        [TagOperacao(op="add", chave="lote", valor="1")],
+    )
+    assert ("lote", "1") in _tags(db, 2)
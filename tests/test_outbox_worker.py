@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.jobs import outbox_worker
+from app.models.outbox import OutboxEvento
+from app.utils.outbox import enfileirar
+
+
+class _StorageRecusando:
+    def __init__(self, recusados):
+        self.recusados = recusados
+        self.pedidos = []
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        self.pedidos.append(keys)
+        return {key: "AccessDenied" for key in keys if key in self.recusados}
+
+
+def test_apagar_objetos_tenta_de_novo_so_o_que_falhou(db, monkeypatch):
+    storage = _StorageRecusando({"1/b.pdf"})
+    monkeypatch.setattr(outbox_worker, "SessionLocal", lambda: Session(db.get_bind()))
+    monkeypatch.setattr(outbox_worker, "get_storage", lambda: storage)
+    monkeypatch.setattr(outbox_worker, "OUTBOX_MAX_TENTATIVAS", 2)
+
+    # o worker usa a mesma conexão SQLite: cada passo encerra a transação
+    # da sessão do teste antes de chamá-lo
+    evento = enfileirar(db, "apagar_objetos", {"bucket_keys": ["1/a.pdf", "1/b.pdf", "1/c.pdf"]})
+    db.commit()
+    evento_id = evento.id
+    db.commit()
+
+    assert outbox_worker.processar_lote() == 1
+    db.refresh(evento)
+    assert evento.status == "pendente"
+    assert evento.tentativas == 1
+    assert evento.payload == {"bucket_keys": ["1/b.pdf"]}
+
+    evento.disponivel_em = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    assert outbox_worker.processar_lote() == 1
+    assert storage.pedidos == [["1/a.pdf", "1/b.pdf", "1/c.pdf"], ["1/b.pdf"]]
+
+    assert [falha.id for falha in outbox_worker.listar_falhas()] == [evento_id]
+
+    storage.recusados = set()
+    assert outbox_worker.reprocessar_falhas([evento_id]) == 1
+    assert outbox_worker.processar_lote() == 1
+    assert outbox_worker.listar_falhas() == []
+    db.expunge_all()
+    assert db.get(OutboxEvento, evento_id) is None
@@ -0,0 +1,62 @@
+import hashlib
+import itertools
+
+import pytest
+
+from app.utils import sha256_retomavel
+from app.utils.sha256_retomavel import Sha256Retomavel, _Sha256Libcrypto, _Sha256Python
+
+_sem_libcrypto = pytest.mark.skipif(
+    sha256_retomavel._libcrypto is None, reason="libcrypto indisponível"
+)
+IMPLEMENTACOES = [
+    pytest.param(_Sha256Python, id="python"),
+    pytest.param(_Sha256Libcrypto, id="libcrypto", marks=_sem_libcrypto),
+]
+
+DADOS = bytes(range(256)) * 3
+
+
+@pytest.mark.parametrize("corte", [0, 63, 64, 65])
+@pytest.mark.parametrize(
+    "origem,destino",
+    [
+        pytest.param(
+            a.values[0],
+            b.values[0],
+            id=f"{a.id}-{b.id}",
+            marks=[*a.marks, *b.marks],
+        )
+        for a, b in itertools.product(IMPLEMENTACOES, repeat=2)
+    ],
+)
+def test_retoma_o_estado_em_qualquer_implementacao(origem, destino, corte):
+    parcial = origem()
+    parcial.update(DADOS[:corte])
+    estado = parcial.estado()
+    assert len(estado) == sha256_retomavel.TAMANHO_ESTADO
+
+    assert destino(estado).digest() == hashlib.sha256(DADOS[:corte]).digest()
+
+    retomado = destino(estado)
+    retomado.update(DADOS[corte:])
+    assert retomado.digest() == hashlib.sha256(DADOS).digest()
+
+
+@pytest.mark.parametrize("implementacao", IMPLEMENTACOES)
+def test_varias_retomadas_em_pedacos_irregulares(implementacao, monkeypatch):
+    if implementacao is _Sha256Python:
+        monkeypatch.setattr(sha256_retomavel, "_libcrypto", None)
+
+    estado = Sha256Retomavel().estado()
+    for inicio, fim in itertools.pairwise([0, 1, 63, 64, 65, 128, 200, len(DADOS)]):
+        sha = Sha256Retomavel(estado)
+        sha.update(DADOS[inicio:fim])
+        estado = sha.estado()
+
+    assert Sha256Retomavel(estado).hexdigest() == hashlib.sha256(DADOS).hexdigest()
+
+
+def test_estado_de_tamanho_errado_e_recusado():
+    with pytest.raises(ValueError):
+        Sha256Retomavel(b"\0" * 10)
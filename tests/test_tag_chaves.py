@@ -0,0 +1,36 @@
+from sqlalchemy import select
+
+from app.models.document import TagChave
+from app.utils.tag_chaves import chaves_tag
+
+
+def test_chave_criada_so_entra_no_cache_depois_do_commit(db):
+    chave_id = chaves_tag.id(db, "tipo")
+    assert "tipo" not in chaves_tag._por_chave
+
+    db.commit()
+    assert chaves_tag._por_chave["tipo"] == chave_id
+
+
+def test_rollback_descarta_a_chave_criada(db):
+    chaves_tag.id(db, "tipo")
+    db.rollback()
+
+    assert "tipo" not in chaves_tag._por_chave
+    assert db.scalar(select(TagChave.id).where(TagChave.chave == "tipo")) is None
+
+    # a sessão reaproveitada não guarda no commit seguinte o id desfeito
+    db.commit()
+    assert "tipo" not in chaves_tag._por_chave
+
+
+def test_chave_que_ja_existia_entra_no_cache_na_hora(db):
+    db.add(TagChave(chave="setor"))
+    db.commit()
+
+    ids = chaves_tag.ids(db, ["setor", "tipo"])
+    assert chaves_tag._por_chave == {"setor": ids["setor"]}
+
+    db.close()
+    db.commit()
+    assert "tipo" not in chaves_tag._por_chave
@@ -0,0 +1,21 @@
+import asyncio
+
+from app.utils.uploads import AdmissaoUploads
+
+
+def test_uploads_sem_cliente_dividem_um_orcamento_de_cliente():
+    async def cenario():
+        admissao = AdmissaoUploads(10, 1000, 1, 100)
+
+        assert await admissao.adquirir(None, 50, 0) is None
+        assert await admissao.adquirir(None, 10, 0) == "cliente"
+        assert await admissao.adquirir(7, 10, 0) is None
+        assert admissao.metricas()["por_cliente"] == {
+            "sem_cliente": {"ativos": 1, "bytes_em_uso": 50},
+            "7": {"ativos": 1, "bytes_em_uso": 10},
+        }
+
+        admissao.liberar(None, 50)
+        assert await admissao.adquirir(None, 10, 0) is None
+
+    asyncio.run(cenario())